@@ -0,0 +1,44 @@
+"""
+One annotation pass over a batch of headlines, for the ingest path.
+
+Sentiment, entities and ticker tags used to each lower-case and tokenize
+every title on their own, and the entity extractor lower-cased every token of
+both of its scans again. `annotate_titles` lower-cases each distinct title
+once and hands that copy to all three:
+
+  * the sentiment lexicon and the ticker matcher scan it as they are
+  * the entity extractor's token and bigram-word scans run on it (for ASCII
+    titles), so neither lower-cases its tokens one by one
+  * a title repeated within the batch is annotated once
+
+Every result is exactly what `score_sentiment_batch`, `extract_entities_batch`
+and `tickers_in_text` return on their own. It is also the one place to spread
+ingest NLP over more processes: sentiment (TRENDFLOW_SENTIMENT_WORKERS) and
+spaCy (TRENDFLOW_SPACY_PROCESSES) both fan out from here.
+"""
+from typing import NamedTuple
+
+from analysis.entity_extractor import extract_entities_batch
+from analysis.market_features import ticker_matcher
+from analysis.sentiment import score_sentiment_batch
+
+
+class Annotation(NamedTuple):
+    sentiment: float
+    entities: list
+    tickers: list
+
+
+def annotate_titles(titles, top_n: int = 10) -> list:
+    """One `Annotation` (sentiment, top entities, tickers) per title, in order."""
+    titles = list(titles)
+    unique = list(dict.fromkeys(titles))
+    lowered = [(t or '').lower() for t in unique]
+
+    sentiments = score_sentiment_batch(unique, lowered=lowered)
+    entities = extract_entities_batch(unique, top_n=top_n, lowered=lowered)
+    matcher = ticker_matcher()
+    tickers = [matcher.match_lower(low) for low in lowered]
+
+    by_title = {t: Annotation(*a) for t, a in zip(unique, zip(sentiments, entities, tickers))}
+    return [by_title[t] for t in titles]
@@ -1,37 +1,60 @@
+import importlib.util
+import os
 import re
 from collections import Counter
 
-try:
-    import spacy as _spacy
-    _nlp = None
-
-    def _get_nlp():
-        global _nlp
-        if _nlp is None:
-            try:
-                _nlp = _spacy.load("en_core_web_sm")
-            except OSError:
-                return None
-        return _nlp
-    SPACY_AVAILABLE = True
-except ImportError:
-    SPACY_AVAILABLE = False
-    _get_nlp = lambda: None
-
-import nltk
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
-
-from nltk.corpus import stopwords
-
-STOP_WORDS = set(stopwords.words('english')) | {
+from analysis.stopwords import english_stopwords
+
+# Only NER and noun chunks are used. Noun chunks need the parser plus POS tags
+# (tagger + attribute_ruler); these components are dead weight per headline.
+_UNUSED_PIPES = ('lemmatizer', 'textcat', 'senter')
+# nlp.pipe tuning for extract_entities_batch
+BATCH_SIZE = int(os.getenv('TRENDFLOW_SPACY_BATCH_SIZE', '256'))
+N_PROCESS = int(os.getenv('TRENDFLOW_SPACY_PROCESSES', '1'))
+
+# spaCy and its model are loaded on first use, not at import
+SPACY_AVAILABLE = importlib.util.find_spec('spacy') is not None
+_nlp = None
+
+
+def _get_nlp():
+    global _nlp, SPACY_AVAILABLE
+    if _nlp is None and SPACY_AVAILABLE:
+        try:
+            import spacy
+            _nlp = spacy.load("en_core_web_sm")
+        except (ImportError, OSError):
+            SPACY_AVAILABLE = False  # no usable model: stay on the token fallback
+            return None
+        for name in _UNUSED_PIPES:
+            if name in _nlp.pipe_names:
+                _nlp.disable_pipe(name)
+    return _nlp
+
+
+# Domain stopwords on top of the English list (loaded on first use, see _stop_words)
+_EXTRA_STOPS = {
     'hn', 'show', 'ask', 'tell', 'use', 'using', 'used', 'also', 'new', 'get',
     'make', 'made', 'need', 'want', 'way', 'like', 'just', 'one', 'would',
     'could', 'think', 'know', 'come', 'first', 'last', 'year', 'time', 'day',
     'thing', 'said', 'says', 'good', 'great', 'best', 'top', 'free', 'open',
 }
+_STOP_WORDS = None
+
+
+def _stop_words() -> frozenset:
+    global _STOP_WORDS
+    if _STOP_WORDS is None:
+        _STOP_WORDS = english_stopwords() | _EXTRA_STOPS
+    return _STOP_WORDS
+
+
+def __getattr__(name):
+    # STOP_WORDS used to be built at import; keep it importable, but lazily
+    if name == 'STOP_WORDS':
+        return _stop_words()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Known tech terms to boost (double-counted for emphasis)
 TECH_TERMS = {
@@ -49,44 +72,96 @@ TECH_TERMS = {
 }
 
 
+_ENTITY_LABELS = ('ORG', 'PRODUCT', 'GPE', 'PERSON', 'WORK_OF_ART', 'EVENT')
+
+
+def _entities_from_doc(doc) -> list:
+    """Named entities and noun-chunk heads from a parsed spaCy Doc."""
+    stop = _stop_words()
+    entities = []
+    for ent in doc.ents:
+        if ent.label_ in _ENTITY_LABELS:
+            clean = ent.text.strip().lower()
+            if len(clean) > 2 and clean not in stop:
+                entities.append(clean)
+    for chunk in doc.noun_chunks:
+        clean = chunk.root.text.strip().lower()
+        if len(clean) > 2 and clean not in stop:
+            entities.append(clean)
+    return entities
+
+
+_TOKEN = re.compile(r'\b[A-Za-z][A-Za-z0-9\+\#\.]*\b')
+_ALPHA_WORD = re.compile(r'\b[A-Za-z]{3,}\b')
+
+
+def _lowered_tokens(pattern, text: str, lower: str = None) -> list:
+    # On ASCII text lower-casing keeps every character's position and class,
+    # so matching the already lower-cased copy gives the lower-cased tokens
+    # directly. Elsewhere (the Kelvin sign lowers to 'k', 'İ' to two
+    # characters) match the original and lower each token.
+    if lower is not None and text.isascii():
+        return pattern.findall(lower)
+    return [t.lower() for t in pattern.findall(text)]
+
+
+def _entities_from_tokens(text: str, lower: str = None) -> list:
+    """Token-level extraction with tech term boosting (no spaCy)."""
+    stop = _stop_words()
+    entities = []
+    for tok in _lowered_tokens(_TOKEN, text, lower):
+        if tok in TECH_TERMS:
+            entities.append(tok)
+            entities.append(tok)  # weight tech terms double
+        elif len(tok) > 3 and tok not in stop:
+            entities.append(tok)
+    return entities
+
+
+def _top_entities(entities: list, text: str, top_n: int, lower: str = None) -> list:
+    # Bigrams from filtered tokens (core improvement over bag-of-words)
+    stop = _stop_words()
+    clean_tokens = [t for t in _lowered_tokens(_ALPHA_WORD, text, lower) if t not in stop]
+    for a, b in zip(clean_tokens, clean_tokens[1:]):
+        entities.append(f"{a} {b}")
+
+    counts = Counter(entities)
+    return [e for e, _ in counts.most_common(top_n)]
+
+
 def extract_entities(text: str, top_n: int = 10) -> list:
     """
     Extract named entities and key noun phrases from text.
     Uses spaCy NER + noun chunks if available; falls back to enhanced NLTK
     with known tech term boosting and bigram extraction.
     """
-    entities = []
     nlp = _get_nlp() if SPACY_AVAILABLE else None
-
     if nlp is not None:
-        doc = nlp(text)
-        for ent in doc.ents:
-            if ent.label_ in ('ORG', 'PRODUCT', 'GPE', 'PERSON', 'WORK_OF_ART', 'EVENT'):
-                clean = ent.text.strip().lower()
-                if len(clean) > 2 and clean not in STOP_WORDS:
-                    entities.append(clean)
-        for chunk in doc.noun_chunks:
-            clean = chunk.root.text.strip().lower()
-            if len(clean) > 2 and clean not in STOP_WORDS:
-                entities.append(clean)
+        entities = _entities_from_doc(nlp(text))
     else:
-        # Token-level extraction with tech term boosting
-        tokens = re.findall(r'\b[A-Za-z][A-Za-z0-9\+\#\.]*\b', text)
-        for tok in tokens:
-            lower = tok.lower()
-            if lower in TECH_TERMS:
-                entities.append(lower)
-                entities.append(lower)  # weight tech terms double
-            elif len(lower) > 3 and lower not in STOP_WORDS:
-                entities.append(lower)
+        entities = _entities_from_tokens(text)
+    return _top_entities(entities, text, top_n)
 
-    # Bigrams from filtered tokens (core improvement over bag-of-words)
-    clean_tokens = [
-        t.lower() for t in re.findall(r'\b[A-Za-z]{3,}\b', text)
-        if t.lower() not in STOP_WORDS
-    ]
-    for a, b in zip(clean_tokens, clean_tokens[1:]):
-        entities.append(f"{a} {b}")
 
-    counts = Counter(entities)
-    return [e for e, _ in counts.most_common(top_n)]
+def extract_entities_batch(texts, top_n: int = 10, batch_size: int = None,
+                           n_process: int = None, lowered=None) -> list:
+    """
+    `extract_entities` for many texts; returns one entity list per text, in order.
+
+    With spaCy, the texts are streamed through `nlp.pipe` in batches of
+    `batch_size` (TRENDFLOW_SPACY_BATCH_SIZE) over `n_process` processes
+    (TRENDFLOW_SPACY_PROCESSES) instead of parsed one call at a time.
+    `lowered` optionally gives each text already lower-cased, in the same order.
+    """
+    texts = list(texts)
+    lowered = [None] * len(texts) if lowered is None else lowered
+    nlp = _get_nlp() if SPACY_AVAILABLE else None
+    if nlp is None or not texts:
+        return [_top_entities(_entities_from_tokens(t, low), t, top_n, low)
+                for t, low in zip(texts, lowered)]
+
+    batch_size = BATCH_SIZE if batch_size is None else batch_size
+    n_process = N_PROCESS if n_process is None else n_process
+    docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+    return [_top_entities(_entities_from_doc(doc), text, top_n, low)
+            for doc, text, low in zip(docs, texts, lowered)]
@@ -1,21 +1,18 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from database.models import Keyword
+from database.models import KeywordHourly, KeywordTerm
+from database.rollup import PLATFORM_WEIGHTS, hour_of
 
-PLATFORM_WEIGHTS = {
-    'hackernews': 1.5,
-    'reddit': 1.3,
-    'github': 1.4,
-    'devto': 1.1,
-    'news': 1.2,
-    'rss': 1.0,
-}
+# PLATFORM_WEIGHTS moved to database/rollup.py; re-exported for existing importers
+__all__ = ['build_feature_matrix', 'FEATURE_COLS', 'PLATFORM_WEIGHTS']
 
 
 def build_feature_matrix(session, hours_back: int = 72) -> pd.DataFrame:
     """
-    Build a rich per-entity feature matrix from the Keyword table.
+    Build a rich per-entity feature matrix from the hourly keyword rollup
+    (keyword_hourly, see database/rollup.py). The window starts at the top of
+    the hour `hours_back` ago, since the rollup keeps whole hours.
 
     Features per entity (latest snapshot):
       raw_count           – total mentions in the window
@@ -26,50 +23,30 @@ def build_feature_matrix(session, hours_back: int = 72) -> pd.DataFrame:
       acceleration        – Δ velocity (velocity_now − velocity_1h_ago)
       day_of_week         – 0=Mon … 6=Sun for time-of-week seasonality
     """
-    cutoff = datetime.utcnow() - timedelta(hours=hours_back)
-    rows = session.query(Keyword).filter(Keyword.timestamp >= cutoff).all()
+    cutoff = hour_of(datetime.utcnow() - timedelta(hours=hours_back))
+    # keyword/platform stay integer ids through every groupby below; the
+    # strings are joined back once, on the final one-row-per-keyword frame
+    rows = (session.query(KeywordHourly.keyword_id, KeywordHourly.platform_id, KeywordHourly.hour,
+                          KeywordHourly.count, KeywordHourly.weighted_count)
+            .filter(KeywordHourly.hour >= cutoff)
+            .all())
 
     if not rows:
         return pd.DataFrame()
 
-    records = [
-        {
-            'keyword': kw.keyword,
-            'platform': kw.platform,
-            'count': kw.count,
-            'hour': kw.timestamp.replace(minute=0, second=0, microsecond=0),
-        }
-        for kw in rows
-    ]
-    df = pd.DataFrame(records)
+    df = pd.DataFrame(rows, columns=['keyword', 'platform', 'hour', 'count', 'cross_source_score'])
 
     # ── Hourly aggregates ────────────────────────────────────────────────────
+    # one rollup row per platform, so these just fold the platforms together
     hourly = (
-        df.groupby(['keyword', 'hour'])['count']
-        .sum()
+        df.groupby(['keyword', 'hour'])
+        .agg(count=('count', 'sum'),
+             platform_diversity=('platform', 'nunique'),
+             cross_source_score=('cross_source_score', 'sum'))
         .reset_index()
         .sort_values(['keyword', 'hour'])
     )
 
-    plat_diversity = (
-        df.groupby(['keyword', 'hour'])['platform']
-        .nunique()
-        .reset_index()
-        .rename(columns={'platform': 'platform_diversity'})
-    )
-    hourly = hourly.merge(plat_diversity, on=['keyword', 'hour'], how='left')
-
-    df['weighted_count'] = df.apply(
-        lambda r: r['count'] * PLATFORM_WEIGHTS.get(r['platform'], 1.0), axis=1
-    )
-    cross = (
-        df.groupby(['keyword', 'hour'])['weighted_count']
-        .sum()
-        .reset_index()
-        .rename(columns={'weighted_count': 'cross_source_score'})
-    )
-    hourly = hourly.merge(cross, on=['keyword', 'hour'], how='left')
-
     # ── EMA per keyword ──────────────────────────────────────────────────────
     ema_frames = []
     for kw, grp in hourly.groupby('keyword'):
@@ -125,7 +102,14 @@ def build_feature_matrix(session, hours_back: int = 72) -> pd.DataFrame:
             latest[col] = latest[col].fillna(0)
 
     latest.drop(columns=['velocity_prev'], inplace=True)
-    return latest
+
+    ids = [int(i) for i in latest['keyword']]
+    terms = {}
+    for i in range(0, len(ids), 500):
+        terms.update(session.query(KeywordTerm.id, KeywordTerm.term)
+                     .filter(KeywordTerm.id.in_(ids[i:i + 500])))
+    latest['keyword'] = latest['keyword'].map(terms)
+    return latest.sort_values('keyword', kind='stable').reset_index(drop=True)
 
 
 FEATURE_COLS = [
@@ -1,24 +1,42 @@
-import nltk
 import string
 import re
 
 from collections import Counter
-from nltk.corpus import stopwords
 
-nltk.download('stopwords')
+from analysis.stopwords import english_stopwords
 
-stop_words = set(stopwords.words('english'))
 CUSTOM_STOPS = {'hn', 'show', 'ask', 'tell'} #non meaningful words to avoid
-ALL_STOPS = stop_words.union(CUSTOM_STOPS) # using all stops to skip non-meaningful words
+_all_stops = None
+
+
+def _stops():
+    global _all_stops
+    if _all_stops is None:
+        _all_stops = english_stopwords() | CUSTOM_STOPS # using all stops to skip non-meaningful words
+    return _all_stops
+
+
+def __getattr__(name):
+    # stop_words / ALL_STOPS used to be built (and downloaded) at import
+    if name == 'stop_words':
+        return english_stopwords()
+    if name == 'ALL_STOPS':
+        return _stops()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def extract_keywords(text, top_n=10):
+    import nltk
+
     sentence = text
     word_tokens = nltk.word_tokenize(sentence)
-    filtered_sentence = [word.lower() for word in word_tokens if word.lower() not in ALL_STOPS and word.isalpha()] #filter by turning everything into smaller case and no punctuation
+    all_stops = _stops()
+    filtered_sentence = [word.lower() for word in word_tokens if word.lower() not in all_stops and word.isalpha()] #filter by turning everything into smaller case and no punctuation
     word_counts = Counter(filtered_sentence)
     top_words = word_counts.most_common(top_n)
     return [word for word, count in top_words]
 
-text = "Show HN: I built a modern web framework using Rust and WebAssembly"
-print(extract_keywords(text, 5))
\ No newline at end of file
+
+if __name__ == "__main__":
+    text = "Show HN: I built a modern web framework using Rust and WebAssembly"
+    print(extract_keywords(text, 5))
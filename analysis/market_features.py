@@ -8,13 +8,13 @@ observable target: does the asset close UP tomorrow?
 This is where keyword/mention volume is "folded in" — it becomes the `buzz`
 feature per ticker, not a prediction target of its own.
 """
-import re
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
-from database.models import Story, MarketData
+from database.models import MarketData, TickerDailySocial
 from config import TICKER_KEYWORDS as TICKER_MAP, TICKER_NAMES  # single source of truth
+from analysis.ticker_matcher import TickerMatcher
 
 FEATURE_COLS = [
     'buzz', 'buzz_velocity', 'avg_sentiment', 'sentiment_std', 'bullish_ratio',
@@ -47,56 +47,62 @@ FEATURE_LABELS = {
 }
 
 
+_matcher = None
+
+
+def ticker_matcher() -> TickerMatcher:
+    """The matcher for the configured universe, built on first use."""
+    global _matcher
+    if _matcher is None:
+        _matcher = TickerMatcher(TICKER_MAP)
+    return _matcher
+
+
 def tickers_in_text(text: str) -> list:
     """Return the tickers whose keywords appear in the text."""
-    low = text.lower()
-    hits = []
-    for ticker, terms in TICKER_MAP.items():
-        for term in terms:
-            # word-boundary match so 'eth' doesn't hit 'method'
-            if re.search(rf'\b{re.escape(term)}\b', low):
-                hits.append(ticker)
-                break
-    return hits
+    # word-boundary match so 'eth' doesn't hit 'method'; the matcher scans
+    # the text in a single pass
+    return ticker_matcher().match(text)
 
 
 def _daily_social(session, days_back: int) -> pd.DataFrame:
-    """Aggregate stories into per-(ticker, date) social features."""
-    cutoff = datetime.utcnow() - timedelta(days=days_back)
-    stories = session.query(Story).filter(Story.timestamp >= cutoff).all()
-
-    recs = []
-    for s in stories:
-        for ticker in tickers_in_text(s.title or ''):
-            recs.append({
-                'ticker': ticker,
-                'date': s.timestamp.date(),
-                'sentiment': s.sentiment if s.sentiment is not None else 0.0,
-                'score': s.score or 0,
-            })
-    if not recs:
+    """
+    Per-(ticker, date) social features, derived from the additive daily sums
+    in ticker_daily_social (database/rollup.py keeps them current at ingest).
+    The window is whole UTC days, from the day `days_back` days ago.
+    """
+    cutoff = (datetime.utcnow() - timedelta(days=days_back)).date()
+    rows = (session.query(TickerDailySocial)
+            .filter(TickerDailySocial.day >= cutoff, TickerDailySocial.mentions > 0)
+            .all())
+    if not rows:
         return pd.DataFrame()
 
-    df = pd.DataFrame(recs)
-    agg = df.groupby(['ticker', 'date']).agg(
-        buzz=('sentiment', 'size'),
-        avg_sentiment=('sentiment', 'mean'),
-        sentiment_std=('sentiment', 'std'),
-        bullish_ratio=('sentiment', lambda x: (x > 0.15).mean()),
-        bull_count=('sentiment', lambda x: int((x > 0.15).sum())),
-        bear_count=('sentiment', lambda x: int((x < -0.15).sum())),
-        weighted_sentiment=('sentiment', 'mean'),  # refined below with score weights
-        total_score=('score', 'sum'),
-    ).reset_index()
-
-    # engagement-weighted sentiment
-    wsum = df.groupby(['ticker', 'date']).apply(
-        lambda g: np.average(g['sentiment'], weights=(g['score'] + 1))
-    ).reset_index(name='weighted_sentiment_w')
-    agg = agg.merge(wsum, on=['ticker', 'date'], how='left')
-    agg['weighted_sentiment'] = agg['weighted_sentiment_w'].fillna(agg['avg_sentiment'])
-    agg.drop(columns=['weighted_sentiment_w'], inplace=True)
-    agg['sentiment_std'] = agg['sentiment_std'].fillna(0.0)
+    df = pd.DataFrame([{
+        'ticker': r.ticker, 'date': r.day, 'n': r.mentions, 's': r.sentiment_sum,
+        'sq': r.sentiment_sq_sum, 'bull_count': r.bull_count, 'bear_count': r.bear_count,
+        'ws': r.weighted_sentiment_sum, 'w': r.weight_sum, 'total_score': r.score_sum,
+    } for r in rows]).sort_values(['ticker', 'date']).reset_index(drop=True)
+
+    n = df['n']
+    mean = df['s'] / n
+    # sample variance from the sums. Σs² − n·mean² cancels badly when every
+    # mention scored the same, so anything at rounding level counts as 0
+    var = ((df['sq'] - df['s'] * mean) / (n - 1)).where(n > 1, 0.0)
+    var = var.where(var > 1e-12 * (df['sq'] / n), 0.0)
+    agg = pd.DataFrame({
+        'ticker': df['ticker'],
+        'date': df['date'],
+        'buzz': n.astype(int),
+        'avg_sentiment': mean,
+        'sentiment_std': np.sqrt(var),
+        'bullish_ratio': df['bull_count'] / n,
+        'bull_count': df['bull_count'].astype(int),
+        'bear_count': df['bear_count'].astype(int),
+        # engagement-weighted: Σ (score + 1)·s / Σ (score + 1)
+        'weighted_sentiment': (df['ws'] / df['w']).where(df['w'] != 0, mean),
+        'total_score': df['total_score'].astype(int),
+    })
     return agg
 
 
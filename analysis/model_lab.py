@@ -454,8 +454,9 @@ def _live_predictions(session, tab_models, scaler, days_back):
 
 
 if __name__ == "__main__":
-    from database.db_setup import getSession
-    r = train_all_models(getSession())
+    from database.db_setup import db_connection, getSession
+    db_connection()
+    r = train_all_models(getSession(readonly=True))
     if not r["ok"]:
         print("ERROR:", r["error"])
     else:
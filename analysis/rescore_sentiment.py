@@ -0,0 +1,113 @@
+"""
+Background re-scoring of stored story sentiment.
+
+`Story.sentiment` is computed at ingest, and each row records the
+SENTIMENT_VERSION that scored it. When the lexicon, the blend or VADER
+changes, the version changes. This job then walks the stories table in id
+order and re-scores every row from an older version (or from before
+versioning), one bounded batch at a time:
+
+  * each batch is scored with `score_sentiment_batch` and written with one
+    executemany UPDATE in its own short transaction
+  * progress (the last id done, per version) is checkpointed in the
+    database's app_state, in the same transaction as the batch's UPDATE, so
+    an interrupted run resumes where it stopped, and switching databases
+    never carries one database's cursor over to another
+  * it sleeps between batches, so the collector's writes never wait long
+    for SQLite's write lock
+
+Run it by hand (`python -m analysis.rescore_sentiment`) or let the
+scheduler give it a time budget after each collection.
+"""
+import argparse
+import time
+
+from sqlalchemy import or_
+
+from analysis.sentiment import SENTIMENT_VERSION, score_sentiment_batch
+from database import bulk
+from database.app_state import get_value, set_value
+from database.db_setup import db_connection, getSession
+from database.models import Story
+
+BATCH_SIZE = 2000
+PAUSE_SECONDS = 0.5
+_STATE_KEY = 'rescore_sentiment'
+
+
+def _next_batch(session, after_id: int, batch_size: int):
+    return (session.query(Story.id, Story.title)
+            .filter(Story.id > after_id,
+                    or_(Story.sentiment_version.is_(None),
+                        Story.sentiment_version != SENTIMENT_VERSION))
+            .order_by(Story.id)
+            .limit(batch_size)
+            .all())
+
+
+def pending(session=None) -> int:
+    """How many stories were scored by another SENTIMENT_VERSION."""
+    own = session is None
+    session = session or getSession()
+    try:
+        return (session.query(Story.id)
+                .filter(or_(Story.sentiment_version.is_(None),
+                            Story.sentiment_version != SENTIMENT_VERSION))
+                .count())
+    finally:
+        if own:
+            session.close()
+
+
+def rescore(batch_size: int = BATCH_SIZE, pause: float = PAUSE_SECONDS,
+            max_seconds: float = None) -> int:
+    """
+    Re-score stale stories until none are left or `max_seconds` have passed.
+    Returns how many rows were updated. Safe to interrupt at any point.
+    """
+    deadline = time.time() + max_seconds if max_seconds is not None else None
+
+    session = getSession()
+    state = get_value(session, _STATE_KEY, {})
+    if state.get('version') != SENTIMENT_VERSION:
+        state = {'version': SENTIMENT_VERSION, 'last_id': 0}
+    updated = 0
+    try:
+        while deadline is None or time.time() < deadline:
+            batch = _next_batch(session, state['last_id'], batch_size)
+            if not batch:
+                # pass complete; the next one starts over to catch rows an
+                # older process wrote behind the cursor
+                state['last_id'] = 0
+                set_value(session, _STATE_KEY, state)
+                session.commit()
+                break
+            scores = score_sentiment_batch([title for _, title in batch])
+            bulk.update_sentiment(session, [
+                {'id': story_id, 'sentiment': score, 'sentiment_version': SENTIMENT_VERSION}
+                for (story_id, _), score in zip(batch, scores)])
+            state['last_id'] = batch[-1][0]
+            set_value(session, _STATE_KEY, state)
+            session.commit()
+
+            updated += len(batch)
+            if len(batch) == batch_size:
+                time.sleep(pause)
+    finally:
+        session.close()
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score stories scored by an older sentiment version.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--pause', type=float, default=PAUSE_SECONDS,
+                        help='seconds to sleep between batches (default: %(default)s)')
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='stop after this long; the next run resumes')
+    args = parser.parse_args()
+
+    db_connection()
+    print(f"Sentiment version {SENTIMENT_VERSION}: {pending()} stories to re-score")
+    n = rescore(args.batch_size, args.pause, args.max_seconds)
+    print(f"Re-scored {n} stories ({pending()} left)")
@@ -5,15 +5,36 @@ social-buzz data actually predictive of market moves.
 Uses VADER (vaderSentiment package) which ships its own lexicon, so it works
 fully offline — no model download, no network. VADER is tuned for short,
 informal, headline-style text, which is exactly what we collect.
+
+`score_sentiment_batch` scores many headlines at once — identical results,
+with repeated titles scored once, titles seen before served from
+`sentiment_cache`, and large batches spread over processes.
+
+SENTIMENT_VERSION fingerprints everything a score depends on (the lexicon,
+the blend, the VADER release). Cached scores are keyed by it.
 """
+import hashlib
+import importlib.util
+import json
+import os
+import re
+
+from analysis import sentiment_cache
 
-try:
-    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-    _analyzer = SentimentIntensityAnalyzer()
-    _AVAILABLE = True
-except Exception:  # pragma: no cover - fallback if package missing
-    _analyzer = None
-    _AVAILABLE = False
+# The VADER analyzer (and its lexicon file) is built on first use, not at import.
+_AVAILABLE = importlib.util.find_spec('vaderSentiment') is not None
+_analyzer = None
+
+
+def _get_analyzer():
+    global _analyzer, _AVAILABLE
+    if _analyzer is None and _AVAILABLE:
+        try:
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+            _analyzer = SentimentIntensityAnalyzer()
+        except Exception:  # pragma: no cover - fallback if package broken
+            _AVAILABLE = False
+    return _analyzer
 
 # Domain lexicon boosts — finance/tech words VADER doesn't weight well.
 _BOOST = {
@@ -25,6 +46,91 @@ _BOOST = {
     'downgrade': -2.0, 'miss': -1.5, 'fraud': -3.0, 'bankruptcy': -3.0, 'delay': -1.0,
 }
 
+# How the two signals are blended: VADER's compound score and the lexicon boost,
+# capped at ±_BOOST_CAP before being normalised to [-1, 1].
+_VADER_WEIGHT = 0.7
+_LEXICON_WEIGHT = 0.3
+_BOOST_CAP = 5.0
+# Bump when the scoring logic changes in a way the values above don't capture.
+_SCORER_REVISION = 1
+
+# The lexicon as one matcher. A zero-width lookahead tries the terms longest
+# first at every position, so it finds a term even inside or overlapping
+# another one; the shorter terms a match starts with ('ban' in 'bankruptcy')
+# are filled in from _IMPLIED. Together that is exactly the set of terms that
+# occur as substrings, found in a single scan.
+_TERMS = sorted(_BOOST, key=len, reverse=True)
+_MATCHER = re.compile('(?=(' + '|'.join(map(re.escape, _TERMS)) + '))')
+_IMPLIED = {t: frozenset(u for u in _BOOST if t.startswith(u)) for t in _BOOST}
+_boost_sums = {}
+
+# Batches at least this large are scored in worker processes.
+PARALLEL_MIN_BATCH = 20000
+WORKERS = int(os.getenv('TRENDFLOW_SENTIMENT_WORKERS', '0')) or os.cpu_count() or 1
+
+
+def _lexicon_boost(lower: str) -> float:
+    """Summed _BOOST weight of every term occurring in `lower`."""
+    found = frozenset().union(*(_IMPLIED[m] for m in _MATCHER.findall(lower)))
+    total = _boost_sums.get(found)
+    if total is None:
+        # summed in _BOOST order, so floating-point rounding is always the same
+        total = _boost_sums[found] = sum(w for term, w in _BOOST.items() if term in found)
+    return total
+
+
+def _blend(base: float, boost: float) -> float:
+    boost = max(-_BOOST_CAP, min(_BOOST_CAP, boost)) / _BOOST_CAP  # normalise to [-1, 1]
+    combined = _VADER_WEIGHT * base + _LEXICON_WEIGHT * boost
+    return max(-1.0, min(1.0, combined))
+
+
+def _sentiment_version() -> str:
+    vader = 'unavailable'
+    if _AVAILABLE:
+        try:
+            from importlib.metadata import version
+            vader = version('vaderSentiment')
+        except Exception:
+            vader = 'unknown'
+    spec = json.dumps({
+        'boost': sorted(_BOOST.items()),
+        'blend': [_VADER_WEIGHT, _LEXICON_WEIGHT, _BOOST_CAP],
+        'revision': _SCORER_REVISION,
+        'vader': vader,
+    })
+    return hashlib.sha1(spec.encode('utf-8')).hexdigest()[:12]
+
+
+SENTIMENT_VERSION = _sentiment_version()
+_cache = None
+
+
+def _get_cache():
+    global _cache
+    if _cache is None and sentiment_cache.ENABLED:
+        _cache = sentiment_cache.SentimentCache(SENTIMENT_VERSION)
+    return _cache
+
+
+def close_cache():
+    """Close and forget the score cache; the next batch opens it afresh (tests, benchmarks)."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+
+
+def _score(text: str, lower: str) -> float:
+    analyzer = _get_analyzer()
+    if analyzer is not None:
+        base = analyzer.polarity_scores(text)['compound']
+    else:
+        base = 0.0
+
+    # Blend in the domain lexicon so finance-specific tone is captured.
+    return _blend(base, _lexicon_boost(lower))
+
 
 def score_sentiment(text: str) -> float:
     """
@@ -33,19 +139,47 @@ def score_sentiment(text: str) -> float:
     """
     if not text:
         return 0.0
+    return _score(text, text.lower())
 
-    if _AVAILABLE:
-        base = _analyzer.polarity_scores(text)['compound']
-    else:
-        base = 0.0
 
-    # Blend in the domain lexicon so finance-specific tone is captured.
-    lower = text.lower()
-    boost = sum(w for term, w in _BOOST.items() if term in lower)
-    boost = max(-5.0, min(5.0, boost)) / 5.0  # normalise to [-1, 1]
+def _score_unique(pairs: list) -> list:
+    return [_score(text, lower) for text, lower in pairs]
 
-    combined = 0.7 * base + 0.3 * boost
-    return max(-1.0, min(1.0, combined))
+
+def score_sentiment_batch(titles, workers: int = None, cache: bool = True,
+                          lowered=None) -> list:
+    """
+    `score_sentiment` for many titles at once; returns scores in input order.
+
+    Repeated titles are scored once, and with `cache` on, titles scored by an
+    earlier batch (under the same SENTIMENT_VERSION) not at all. Batches of
+    PARALLEL_MIN_BATCH or more titles left to score are split across
+    `workers` processes (default TRENDFLOW_SENTIMENT_WORKERS, else one per CPU).
+    `lowered` optionally gives each title already lower-cased, in the same order.
+    """
+    titles = list(titles)
+    lower_of = dict(zip(titles, lowered)) if lowered is not None else {}
+    unique = list(dict.fromkeys(t for t in titles if t))
+    workers = WORKERS if workers is None else workers
+
+    store = _get_cache() if cache else None
+    by_title = store.get_many(unique) if store is not None else {}
+    todo = [(t, lower_of.get(t) or t.lower()) for t in unique if t not in by_title]
+
+    if workers > 1 and len(todo) >= PARALLEL_MIN_BATCH:
+        from concurrent.futures import ProcessPoolExecutor
+        size = -(-len(todo) // workers)
+        chunks = [todo[i:i + size] for i in range(0, len(todo), size)]
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            scores = [s for part in pool.map(_score_unique, chunks) for s in part]
+    else:
+        scores = _score_unique(todo)
+
+    fresh = {t: s for (t, _), s in zip(todo, scores)}
+    if store is not None:
+        store.put_many(fresh)
+    by_title.update(fresh)
+    return [by_title[t] if t else 0.0 for t in titles]
 
 
 def sentiment_label(score: float) -> str:
@@ -57,4 +191,4 @@ def sentiment_label(score: float) -> str:
 
 
 def is_available() -> bool:
-    return _AVAILABLE
+    return _get_analyzer() is not None
@@ -0,0 +1,155 @@
+"""
+Content-addressed cache of headline sentiment scores.
+
+The same headline routinely arrives from several sources (HN, Reddit, RSS,
+yfinance), and seed_data re-generates the same template titles over and over.
+Scores are keyed by the SHA-1 of the title and stored per scorer version (see
+`sentiment.SENTIMENT_VERSION`), so a repeated title costs a lookup and a
+lexicon or VADER change simply starts a fresh version instead of serving stale
+scores.
+
+Two tiers:
+  * an in-memory LRU of the most recently used scores
+  * a SQLite file under CACHE_DIR that survives restarts, shared by every
+    process whatever its version; each row records the day it was last used,
+    rows unused for MAX_AGE_DAYS are dropped, and past MAX_ROWS the least
+    recently used go first (checked on open and as rows are written)
+
+Set TRENDFLOW_SENTIMENT_CACHE=0 to disable it,
+TRENDFLOW_SENTIMENT_CACHE_SIZE to change how many scores stay in memory, and
+TRENDFLOW_SENTIMENT_CACHE_ROWS / TRENDFLOW_SENTIMENT_CACHE_DAYS to bound the file.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import CACHE_DIR
+
+ENABLED = os.getenv('TRENDFLOW_SENTIMENT_CACHE', '1') != '0'
+MEMORY_ENTRIES = int(os.getenv('TRENDFLOW_SENTIMENT_CACHE_SIZE', '100000'))
+MAX_ROWS = int(os.getenv('TRENDFLOW_SENTIMENT_CACHE_ROWS', '1000000'))
+MAX_AGE_DAYS = int(os.getenv('TRENDFLOW_SENTIMENT_CACHE_DAYS', '30'))
+DB_NAME = 'sentiment.sqlite'
+_SQL_BATCH = 500   # stay under SQLite's bound-parameter limit
+
+
+def title_key(title: str) -> bytes:
+    return hashlib.sha1(title.encode('utf-8')).digest()
+
+
+def _today() -> int:
+    return int(time.time() // 86400)
+
+
+class SentimentCache:
+    """Scores for one scorer `version`: memory LRU in front of a SQLite table."""
+
+    def __init__(self, version: str, path: str = None, max_memory: int = MEMORY_ENTRIES,
+                 max_rows: int = MAX_ROWS):
+        self.version = version
+        self.max_memory = max_memory
+        self.max_rows = max_rows
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._written = 0   # rows written since the last trim
+        path = path or os.path.join(CACHE_DIR, DB_NAME)
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            columns = {row[1] for row in self._db.execute('PRAGMA table_info(scores)')}
+            if columns and 'used' not in columns:
+                self._db.execute('DROP TABLE scores')   # an older layout; it is only a cache
+            self._db.execute('CREATE TABLE IF NOT EXISTS scores ('
+                             'version TEXT NOT NULL, title_hash BLOB NOT NULL, '
+                             'score REAL NOT NULL, used INTEGER NOT NULL, '
+                             'PRIMARY KEY (version, title_hash)) WITHOUT ROWID')
+            self._db.execute('CREATE INDEX IF NOT EXISTS ix_scores_used ON scores (used)')
+            self._trim()
+            self._db.commit()
+        except (OSError, sqlite3.Error) as e:
+            # a read-only or broken cache dir only costs the persistent tier
+            print(f"  sentiment cache: persistent tier disabled ({e})")
+            self._db = None
+
+    def _trim(self):
+        """Drop rows unused for MAX_AGE_DAYS, then the least recently used past max_rows."""
+        self._db.execute('DELETE FROM scores WHERE used < ?', (_today() - MAX_AGE_DAYS,))
+        excess = self._db.execute('SELECT COUNT(*) FROM scores').fetchone()[0] - self.max_rows
+        if excess > 0:
+            self._db.execute('DELETE FROM scores WHERE (version, title_hash) IN '
+                             '(SELECT version, title_hash FROM scores ORDER BY used LIMIT ?)',
+                             (excess,))
+        self._written = 0
+
+    def _remember(self, key: bytes, score: float):
+        self._memory[key] = score
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def get_many(self, titles) -> dict:
+        """{title: score} for the titles already cached."""
+        found = {}
+        missing = {}
+        with self._lock:
+            for title in titles:
+                key = title_key(title)
+                score = self._memory.get(key)
+                if score is None:
+                    missing[key] = title
+                else:
+                    self._memory.move_to_end(key)
+                    found[title] = score
+            if missing and self._db is not None:
+                keys = list(missing)
+                today = _today()
+                stale = []   # hits whose last-used day needs moving to today
+                for i in range(0, len(keys), _SQL_BATCH):
+                    chunk = keys[i:i + _SQL_BATCH]
+                    marks = ','.join('?' * len(chunk))
+                    for key, score, used in self._db.execute(
+                            f'SELECT title_hash, score, used FROM scores '
+                            f'WHERE version = ? AND title_hash IN ({marks})',
+                            [self.version] + chunk):
+                        found[missing[key]] = score
+                        self._remember(key, score)
+                        if used < today:
+                            stale.append(key)
+                if stale:
+                    try:
+                        self._db.executemany(
+                            'UPDATE scores SET used = ? WHERE version = ? AND title_hash = ?',
+                            [(today, self.version, key) for key in stale])
+                        self._db.commit()
+                    except sqlite3.Error as e:
+                        print(f"  sentiment cache write failed: {e}")
+        return found
+
+    def put_many(self, scores: dict):
+        """Store {title: score} in both tiers."""
+        if not scores:
+            return
+        today = _today()
+        rows = [(self.version, title_key(t), s, today) for t, s in scores.items()]
+        with self._lock:
+            for _, key, score, _ in rows:
+                self._remember(key, score)
+            if self._db is not None:
+                try:
+                    self._db.executemany('INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)', rows)
+                    self._written += len(rows)
+                    if self._written >= max(self.max_rows // 10, 1):
+                        self._trim()
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"  sentiment cache write failed: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,89 @@
+"""
+Ticker keyword matching in one pass over a headline.
+
+The naive way — one `\\b<term>\\b` regex search per keyword per ticker — costs
+O(tickers × keywords) per title, which is fine for ten tickers and unusable
+for a real 500–5000 symbol universe. `TickerMatcher` is built once per ticker
+universe and then walks the title's words a single time.
+
+Why a word index is enough: a term that starts with a word character can only
+match where a word starts (that is what the leading `\\b` means), and the text
+word there must equal the term's first word exactly (the term either ends
+there, so the trailing `\\b` needs the text word to end too, or continues with
+a non-word character, which the text must then also have). So each word of
+the title is looked up in a dict of terms keyed by their first word, and the
+few candidates are verified in place. Terms that start with a non-word
+character (`$btc`, `.net`) are indexed by that character instead and checked
+wherever it occurs. Results are exactly those of the per-term regex scan, in
+the universe's ticker order.
+"""
+import re
+
+_WORD = re.compile(r'\w+')
+
+
+def _is_word(ch: str) -> bool:
+    # the same notion of a word character as re's \w / \b on str patterns
+    return ch.isalnum() or ch == '_'
+
+
+class TickerMatcher:
+    """Matches the keywords of a {ticker: [keyword, ...]} universe against text."""
+
+    def __init__(self, ticker_keywords: dict):
+        self.tickers = list(ticker_keywords)
+        term_tickers = {}
+        for index, ticker in enumerate(self.tickers):
+            for term in ticker_keywords[ticker]:
+                term_tickers.setdefault(term, set()).add(index)
+
+        self._by_first_word = {}
+        self._by_first_char = {}
+        self._empty = frozenset()
+        for term, indexes in term_tickers.items():
+            entry = (term, _is_word(term[-1]) if term else False, frozenset(indexes))
+            first = _WORD.match(term)
+            if first:
+                self._by_first_word.setdefault(first.group(), []).append(entry)
+            elif term:
+                self._by_first_char.setdefault(term[0], []).append(entry)
+            else:
+                self._empty = frozenset(indexes)  # r'\b\b': any word in the text
+        self._first_chars = (re.compile('[' + ''.join(map(re.escape, self._by_first_char)) + ']')
+                             if self._by_first_char else None)
+
+    @staticmethod
+    def _verify(low, start, candidates, hits):
+        """Add the tickers of candidates found at `start` with a word boundary after them."""
+        for term, ends_in_word, indexes in candidates:
+            if indexes <= hits or not low.startswith(term, start):
+                continue
+            end = start + len(term)
+            next_is_word = end < len(low) and _is_word(low[end])
+            if ends_in_word != next_is_word:
+                hits |= indexes
+        return hits
+
+    def match_lower(self, low: str) -> list:
+        """Tickers with a keyword in `low` (already lower-cased), in universe order."""
+        hits = set()
+        by_first_word = self._by_first_word
+        for m in _WORD.finditer(low):
+            candidates = by_first_word.get(m.group())
+            if candidates:
+                # a word start: the character before it is never a word character
+                hits = self._verify(low, m.start(), candidates, hits)
+        if self._first_chars is not None:
+            for m in self._first_chars.finditer(low):
+                # the term starts with a non-word character, so its leading \b
+                # needs a word character right before it
+                start = m.start()
+                if start and _is_word(low[start - 1]):
+                    hits = self._verify(low, start, self._by_first_char[m.group()], hits)
+        if self._empty and _WORD.search(low):
+            hits |= self._empty
+        return [self.tickers[i] for i in sorted(hits)]
+
+    def match(self, text: str) -> list:
+        """Tickers whose keywords appear in `text`, in universe order."""
+        return self.match_lower(text.lower())
@@ -0,0 +1,91 @@
+"""
+Story -> ticker tags, stored in the `story_tickers` table.
+
+Which tickers a headline mentions only depends on its title and the ticker
+universe in config, so it is worked out once, when the story is ingested,
+instead of every time the features or the dashboard need it. Readers join
+`story_tickers` (indexed by ticker) rather than re-matching every title.
+
+The universe is fingerprinted, and the fingerprint the tags were built for is
+kept in the database itself (app_state), committed with the tags: when
+tickers.json changes, `ensure_current` (run by `db_setup.db_connection`)
+re-tags every stored story against the new universe. Run it by hand with
+`python -m analysis.ticker_tags` (add `--rebuild` to force a full re-tag).
+"""
+import argparse
+import hashlib
+import json
+
+from config import TICKER_KEYWORDS
+from analysis.market_features import tickers_in_text
+from database import bulk
+from database.app_state import get_value, set_value
+from database.models import Story, StoryTicker
+from database.rollup import clear_ticker_daily_social
+
+BATCH_SIZE = 5000
+_STATE_KEY = 'ticker_tags.universe'
+
+
+def universe_fingerprint() -> str:
+    """Changes whenever a ticker or one of its keywords does."""
+    spec = json.dumps(TICKER_KEYWORDS, sort_keys=True)
+    return hashlib.sha1(spec.encode('utf-8')).hexdigest()[:12]
+
+
+def tag_stories(session, stories, tickers_by_title: dict = None) -> int:
+    """
+    Tag (id, title) pairs; tags already stored are left alone. Doesn't commit.
+    `tickers_by_title` can supply titles already matched (see analysis/annotate.py).
+    """
+    known = tickers_by_title or {}
+    rows = [{'story_id': story_id, 'ticker': ticker}
+            for story_id, title in stories
+            for ticker in (known[title] if title in known else tickers_in_text(title or ''))]
+    return bulk.insert_story_tickers(session, rows)
+
+
+def backfill(session, rebuild: bool = False, batch_size: int = BATCH_SIZE) -> int:
+    """Tag every stored story (after dropping all tags, with `rebuild`) and commit."""
+    if rebuild:
+        # the daily sums are rebuilt from the tags as they are re-added
+        clear_ticker_daily_social(session.connection())
+        session.query(StoryTicker).delete()
+    tagged = 0
+    last_id = 0
+    while True:
+        batch = (session.query(Story.id, Story.title)
+                 .filter(Story.id > last_id)
+                 .order_by(Story.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            break
+        tagged += tag_stories(session, batch)
+        last_id = batch[-1][0]
+    set_value(session, _STATE_KEY, universe_fingerprint())
+    session.commit()
+    return tagged
+
+
+def ensure_current(session) -> bool:
+    """Re-tag everything if the tags were built for another universe. True if it did."""
+    if get_value(session, _STATE_KEY) == universe_fingerprint():
+        return False
+    print("Ticker universe changed (or tags not built yet) — re-tagging stories…")
+    n = backfill(session, rebuild=True)
+    print(f"Tagged {n} story↔ticker mentions")
+    return True
+
+
+if __name__ == "__main__":
+    from database.db_setup import db_connection, getSession
+
+    parser = argparse.ArgumentParser(description="Tag stored stories with the tickers they mention.")
+    parser.add_argument('--rebuild', action='store_true', help='drop all tags and re-tag from scratch')
+    args = parser.parse_args()
+
+    db_connection()
+    session = getSession()
+    n = backfill(session, rebuild=args.rebuild)
+    print(f"Tagged {n} story↔ticker mentions")
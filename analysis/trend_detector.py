@@ -1,24 +1,28 @@
 from datetime import datetime, timedelta
-from database.models import Keyword
+from database.models import KeywordCount, KeywordTerm
 
 def detect_trending_keywords(session, velocity_threshold=2.0):
     # Get recent keywords (last hour)
     recent_time = datetime.utcnow() - timedelta(hours=1)
-    recent_keywords = session.query(Keyword).filter(
-        Keyword.timestamp >= recent_time
+    recent_keywords = session.query(KeywordCount.keyword_id, KeywordCount.count, KeywordCount.id).filter(
+        KeywordCount.timestamp >= recent_time
     ).all()
     
     # Get baseline keywords (same period, 7 days ago)
     baseline_start = datetime.utcnow() - timedelta(days=7, hours=1)
     baseline_end = datetime.utcnow() - timedelta(days=7)
-    baseline_keywords = session.query(Keyword).filter(
-        Keyword.timestamp >= baseline_start,
-        Keyword.timestamp <= baseline_end
+    baseline_keywords = session.query(KeywordCount.keyword_id, KeywordCount.count, KeywordCount.id).filter(
+        KeywordCount.timestamp >= baseline_start,
+        KeywordCount.timestamp <= baseline_end
     ).all()
     
-    # Convert to dictionaries {keyword: count}
-    recent_dict = {kw.keyword: kw.count for kw in recent_keywords}
-    baseline_dict = {kw.keyword: kw.count for kw in baseline_keywords}
+    # Convert to dictionaries {keyword id: count}, in row order (sorted here so
+    # the query can stay a range search on ix_keyword_counts_timestamp);
+    # strings only for the result
+    recent_dict = {kw_id: count for kw_id, count, _ in sorted(recent_keywords, key=lambda r: r[2])
+                   if kw_id is not None}
+    baseline_dict = {kw_id: count for kw_id, count, _ in sorted(baseline_keywords, key=lambda r: r[2])
+                     if kw_id is not None}
     
     # Calculate velocity for each keyword
     trending = []
@@ -37,12 +41,20 @@ def detect_trending_keywords(session, velocity_threshold=2.0):
         # If velocity exceeds threshold, it's trending
         if velocity >= velocity_threshold:
             trending.append({
-                'keyword': keyword,
+                'keyword': keyword,  # keyword id until the lookup below
                 'velocity': velocity,
                 'recent_count': recent_count,
                 'baseline_count': baseline_count
             })
     
+    ids = [t['keyword'] for t in trending]
+    terms = {}
+    for i in range(0, len(ids), 500):
+        terms.update(session.query(KeywordTerm.id, KeywordTerm.term)
+                     .filter(KeywordTerm.id.in_(ids[i:i + 500])))
+    for t in trending:
+        t['keyword'] = terms[t['keyword']]
+
     # Sort by velocity (highest first)
     trending.sort(key=lambda x: x['velocity'], reverse=True)
     
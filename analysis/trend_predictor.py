@@ -135,8 +135,9 @@ def get_feature_importances(model) -> pd.DataFrame:
 
 
 if __name__ == "__main__":
-    from database.db_setup import getSession
-    session = getSession()
+    from database.db_setup import db_connection, getSession
+    db_connection()
+    session = getSession(readonly=True)
     print("Training model…")
     m, s, result = load_or_train_model(session)
     if m:
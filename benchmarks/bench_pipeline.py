@@ -0,0 +1,110 @@
+"""
+End-to-end ingest benchmark for `run_pipeline`, run entirely offline.
+
+Record a cassette once, on a machine with network access:
+
+    python -m benchmarks.bench_pipeline --record
+
+then time the pipeline against it as often as you like, with no network:
+
+    python -m benchmarks.bench_pipeline                  # 5 runs, no added latency
+    python -m benchmarks.bench_pipeline --latency-ms 80  # model a real round trip
+    python -m benchmarks.bench_pipeline --sequential     # TRENDFLOW_PARALLEL=0 path
+
+Every run starts in a fresh scratch directory (empty database, no crawl state)
+and makes two passes: a cold ingest of everything in the cassette, then a warm
+pass that exercises the incremental paths — seen RSS entries, HN engagement
+refresh, URL dedup and price-bar upserts. Your own trendflow.db and
+.trendflow_cache are never touched.
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+DEFAULT_CASSETTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes', 'pipeline')
+
+
+def _configure(args):
+    # must happen before anything imports the collectors, which read it once
+    os.environ['TRENDFLOW_CASSETTE'] = 'record' if args.record else 'replay'
+    os.environ['TRENDFLOW_CASSETTE_DIR'] = os.path.abspath(args.cassette)
+    os.environ['TRENDFLOW_CASSETTE_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['TRENDFLOW_CACHE_DIR'] = '.trendflow_cache'   # relative to each scratch dir
+    os.environ['TRENDFLOW_DB_URL'] = 'sqlite:///trendflow.db'  # likewise
+    if not args.record:
+        # the key is scrubbed from recordings, so any value matches on replay
+        os.environ.setdefault('NEWS_API_KEY', 'replay')
+
+
+def _timed(run_pipeline, parallel: bool, verbose: bool) -> float:
+    out = sys.stdout if verbose else io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        run_pipeline(parallel=parallel)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--record', action='store_true',
+                        help='record a new cassette from the live sources (needs network)')
+    parser.add_argument('--cassette', default=DEFAULT_CASSETTE,
+                        help='cassette directory (default: %(default)s)')
+    parser.add_argument('--runs', type=int, default=5, help='timed runs (default: 5)')
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help='delay added to every replayed response')
+    parser.add_argument('--sequential', action='store_true',
+                        help='fetch sources one at a time instead of concurrently')
+    parser.add_argument('--verbose', action='store_true', help='show pipeline output')
+    args = parser.parse_args(argv)
+
+    if not args.record and not os.path.isdir(args.cassette):
+        parser.error(f"no cassette at {args.cassette} — record one with --record first")
+    _configure(args)
+    runs = 1 if args.record else args.runs
+    parallel = not args.sequential
+
+    home = os.getcwd()
+    sys.path.insert(0, home)
+    cold, warm = [], []
+    try:
+        for i in range(runs):
+            with tempfile.TemporaryDirectory(prefix='trendflow-bench-') as scratch:
+                os.chdir(scratch)
+                # the database is trendflow.db in the scratch dir; the engine is
+                # per path, so each run gets its own (disposed below)
+                from test_hn_api import run_pipeline
+                from analysis.sentiment import close_cache
+                from database.db_setup import dispose_engines
+
+                # a cold run starts with no pooled connections and no cached
+                # sentiment scores, in memory or in the previous run's file
+                dispose_engines()
+                close_cache()
+                cold.append(_timed(run_pipeline, parallel, args.verbose))
+                if not args.record:
+                    warm.append(_timed(run_pipeline, parallel, args.verbose))
+                dispose_engines()
+                os.chdir(home)
+            print(f"run {i + 1}/{runs}: cold {cold[-1]:.2f}s"
+                  + (f", warm {warm[-1]:.2f}s" if warm else ""))
+    finally:
+        os.chdir(home)
+
+    if args.record:
+        print(f"Recorded cassette in {args.cassette}")
+        return
+    mode = 'parallel' if parallel else 'sequential'
+    print(f"\n{mode}, {args.latency_ms:g} ms replay latency, {runs} runs")
+    for name, times in (('cold', cold), ('warm', warm)):
+        print(f"  {name}: median {statistics.median(times):.3f}s  "
+              f"min {min(times):.3f}s  max {max(times):.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Ticker matching benchmark: the compiled `TickerMatcher` against the per-term
+regex scan it replaced, on synthetic universes of 10 / 500 / 5000 tickers.
+
+    python -m benchmarks.bench_ticker_matcher
+    python -m benchmarks.bench_ticker_matcher --titles 5000 --sizes 10 500 5000 20000
+
+Both are run over the same headlines and must return identical tickers; the
+old scan is timed on a sample only, since at thousands of tickers it takes
+long enough to be the benchmark.
+"""
+import argparse
+import random
+import re
+import string
+import time
+
+from analysis.ticker_matcher import TickerMatcher
+from config import TICKER_KEYWORDS
+
+_FILLER = ('the', 'a', 'to', 'of', 'on', 'in', 'after', 'with', 'new', 'report',
+           'shares', 'rise', 'fall', 'deal', 'ceo', 'says', 'market', 'q3', 'ai')
+
+
+def _word(rng):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+
+
+def make_universe(size: int, rng) -> dict:
+    """`size` tickers shaped like the real config: names, symbols, phrases, odd terms."""
+    universe = dict(list(TICKER_KEYWORDS.items())[:size])
+    while len(universe) < size:
+        name = _word(rng)
+        symbol = name[:4] + str(len(universe))
+        terms = [name, symbol, f'{name} {_word(rng)}', _word(rng)]
+        if rng.random() < 0.05:
+            terms.append(f'${symbol}')          # starts with a non-word character
+        if rng.random() < 0.05:
+            terms.append(f'{name}++')           # ends with one
+        universe[symbol.upper()] = terms
+    return universe
+
+
+def make_titles(universe: dict, n: int, rng) -> list:
+    terms = [t for kws in universe.values() for t in kws]
+    titles = []
+    for _ in range(n):
+        words = [rng.choice(_FILLER) for _ in range(rng.randint(5, 12))]
+        for _ in range(rng.randint(0, 3)):
+            term = rng.choice(terms)
+            # sometimes glue it to a neighbour so the word boundary has to reject it
+            words.insert(rng.randrange(len(words) + 1), term + rng.choice(['', '', 's', ':']))
+        titles.append(' '.join(words).capitalize())
+    return titles
+
+
+def scan_per_term(universe: dict, text: str) -> list:
+    """The original tickers_in_text: one regex search per term per ticker."""
+    low = text.lower()
+    hits = []
+    for ticker, terms in universe.items():
+        for term in terms:
+            if re.search(rf'\b{re.escape(term)}\b', low):
+                hits.append(ticker)
+                break
+    return hits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--titles', type=int, default=2000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 500, 5000])
+    parser.add_argument('--baseline-sample', type=int, default=200,
+                        help='titles to time the old per-term scan on')
+    args = parser.parse_args(argv)
+    rng = random.Random(7)
+
+    print(f"{'tickers':>8} {'build ms':>9} {'matcher µs/title':>17} "
+          f"{'per-term µs/title':>18} {'speedup':>8}")
+    for size in args.sizes:
+        universe = make_universe(size, rng)
+        titles = make_titles(universe, args.titles, rng)
+
+        start = time.perf_counter()
+        matcher = TickerMatcher(universe)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fast = [matcher.match(t) for t in titles]
+        fast_us = (time.perf_counter() - start) / len(titles) * 1e6
+
+        sample = titles[:args.baseline_sample]
+        start = time.perf_counter()
+        slow = [scan_per_term(universe, t) for t in sample]
+        slow_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+        if fast[:len(sample)] != slow:
+            bad = next(i for i, (a, b) in enumerate(zip(fast, slow)) if a != b)
+            raise SystemExit(f"mismatch on {titles[bad]!r}: {fast[bad]} != {slow[bad]}")
+        print(f"{size:>8} {build * 1000:>9.1f} {fast_us:>17.1f} {slow_us:>18.1f} "
+              f"{slow_us / fast_us:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
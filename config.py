@@ -71,3 +71,9 @@ TICKER_KEYWORDS = {tk: meta["keywords"] for tk, meta in TICKERS.items()}
 
 def seed_start_price(ticker: str) -> float:
     return float(SEED_START_PRICE.get(ticker, DEFAULT_SEED_PRICE))
+
+
+# ── Runtime paths ────────────────────────────────────────────────────────────
+# Scratch space for HTTP response caches and collector state. Everything in it
+# can be rebuilt from the network, so it is safe to delete at any time.
+CACHE_DIR = os.getenv("TRENDFLOW_CACHE_DIR", ".trendflow_cache")
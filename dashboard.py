@@ -1,4 +1,3 @@
-import os
 from datetime import datetime
 
 from dotenv import load_dotenv
@@ -10,8 +9,8 @@ import streamlit as st
 import plotly.graph_objects as go
 
 from sqlalchemy import func
-from database.db_setup import getSession
-from database.models import Story, MarketData
+from database.db_setup import database_exists, db_connection, getSession
+from database.models import Story, StoryTicker, MarketData
 from analysis.model_lab import (
     train_all_models, MODEL_EXPLAINERS,
     compute_leaderboard, compute_strategy, compute_pred_vs_actual, compute_backtest_stats,
@@ -23,7 +22,7 @@ LOOKBACK = 120  # days of history the models train on
 st.set_page_config(page_title="AlphaSignal", layout="wide",
                    initial_sidebar_state="expanded")
 
-if not os.path.exists("trendflow.db"):
+if not database_exists():
     st.warning("No database found. Run `python seed_data.py` (demo) or "
                "`python test_hn_api.py` (live) first.")
     st.stop()
@@ -64,7 +63,15 @@ def sfig(fig, height=None):
     return fig
 
 
-session = getSession()
+@st.cache_resource
+def _prepare_database():
+    """Once per process: upgrade the schema and re-tag if tickers.json changed."""
+    db_connection()
+
+
+_prepare_database()
+# read-only, on SQLite's WAL: never waits for a collection run's commit
+session = getSession(readonly=True)
 
 @st.cache_resource(show_spinner="Training Linear Regression, Random Forest and the LSTM…")
 def _train_cached(lookback_days, data_version):
@@ -83,21 +90,25 @@ def get_lab():
 @st.cache_data(show_spinner=False)
 def _headlines_by_ticker(selected, _ver, limit_per=6):
     """Most-recent scored headlines per ticker, for the evidence panels."""
-    from analysis.market_features import tickers_in_text
     out = {}
-    stories = session.query(Story).order_by(Story.timestamp.desc()).limit(5000).all()
-    for s in stories:
-        src = (s.platform or "web").replace("hackernews", "Hacker News").replace(
-            "rss", "RSS").replace("finance", "Yahoo Finance").replace("news", "NewsAPI")
-        for tk in tickers_in_text(s.title or ""):
-            if tk not in selected:
-                continue
-            bucket = out.setdefault(tk, [])
-            if len(bucket) < limit_per:
-                bucket.append((s.title, s.sentiment or 0.0, src))
+    for tk in selected:
+        for s in _recent_headlines(tk, limit_per):
+            src = (s.platform or "web").replace("hackernews", "Hacker News").replace(
+                "rss", "RSS").replace("finance", "Yahoo Finance").replace("news", "NewsAPI")
+            out.setdefault(tk, []).append((s.title, s.sentiment or 0.0, src))
     return out
 
 
+def _recent_headlines(ticker, limit):
+    """The newest stories tagged with `ticker` (tags are stored at ingest)."""
+    return (session.query(Story)
+            .join(StoryTicker, StoryTicker.story_id == Story.id)
+            .filter(StoryTicker.ticker == ticker, Story.near_dup.isnot(True))
+            .order_by(Story.timestamp.desc())
+            .limit(limit)
+            .all())
+
+
 # ── Sidebar: brand + asset filter ─────────────────────────────────────────────
 _all_names = [TICKER_NAMES[t] for t in TICKER_NAMES]
 with st.sidebar:
@@ -333,7 +344,7 @@ def page_predictions():
 
 # ═══════════════════════════ PAGE 3 · SENTIMENT ══════════════════════════════
 def page_sentiment():
-    from analysis.market_features import tickers_in_text, TICKER_NAMES
+    from analysis.market_features import TICKER_NAMES
     st.title("Sentiment")
     st.markdown("<div class='lede'>The input signal: every headline scored from "
                 "<b>−1 bearish</b> to <b>+1 bullish</b> (VADER + a finance word-list).</div>",
@@ -341,10 +352,14 @@ def page_sentiment():
 
     if _need_assets():
         return
-    rows = [{"name": TICKER_NAMES.get(tk, tk), "sentiment": s.sentiment or 0.0,
-             "title": s.title}
-            for s in session.query(Story).all()
-            for tk in tickers_in_text(s.title or "") if tk in SELECTED]
+    mentions = (session.query(StoryTicker.ticker, Story.sentiment, Story.title)
+                .join(Story, Story.id == StoryTicker.story_id)
+                .filter(StoryTicker.ticker.in_(SELECTED), Story.near_dup.isnot(True))
+                .order_by(Story.id)
+                .all())
+    rows = [{"name": TICKER_NAMES.get(tk, tk), "sentiment": sentiment or 0.0,
+             "title": title}
+            for tk, sentiment, title in mentions]
     if not rows:
         st.info("No headlines for the selected assets.")
         return
@@ -376,7 +391,7 @@ def page_sentiment():
 
 # ═══════════════════════════ PAGE 4 · HOW IT WORKS ═══════════════════════════
 def page_howitworks():
-    from analysis.market_features import tickers_in_text, FEATURE_LABELS
+    from analysis.market_features import FEATURE_LABELS
     st.title("How it works")
     st.markdown("<div class='lede'>Follow one real prediction from raw headlines all the "
                 "way to a number — no black box.</div>", unsafe_allow_html=True)
@@ -402,8 +417,7 @@ def page_howitworks():
     st.markdown(f"### 1 · Collect headlines about {name}")
     st.markdown("<div class='note'>Each headline is scored −1 (bearish) → +1 (bullish) "
                 "by VADER + a finance word-list.</div>", unsafe_allow_html=True)
-    heads = [s for s in session.query(Story).order_by(Story.timestamp.desc()).limit(4000).all()
-             if ticker in tickers_in_text(s.title or "")][:6]
+    heads = _recent_headlines(ticker, 6)
     if heads:
         for s in heads:
             v = s.sentiment or 0.0
@@ -0,0 +1,147 @@
+"""
+Record/replay of the collectors' network traffic, for offline benchmarking.
+
+With TRENDFLOW_CASSETTE=record every HTTP exchange made through `http_client`
+(HN, Reddit, Dev.to, GitHub, RSS, NewsAPI) is saved under
+TRENDFLOW_CASSETTE_DIR, along with the results of the yfinance calls, which
+don't go through `requests` sessions we control and are recorded at the
+function level instead. With TRENDFLOW_CASSETTE=replay the same requests are
+answered from disk by a transport adapter mounted on the shared sessions —
+nothing leaves the machine, so `run_pipeline` can be timed deterministically
+on a disconnected box. TRENDFLOW_CASSETTE_LATENCY_MS adds a fixed delay to each
+replayed response to model a real network round trip.
+
+While a cassette is active the HTTP disk cache is bypassed (a 304 would leave
+nothing to record) and replayed hosts are not rate limited. Requests are
+matched on method and URL; API keys are never written to disk, and ISO dates
+in query strings are masked so a cassette recorded on one day replays on the
+next. A request with no recording fails like an unreachable host.
+"""
+import hashlib
+import io
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+MODE = os.getenv('TRENDFLOW_CASSETTE', '').strip().lower()
+if MODE not in ('', 'off', 'record', 'replay'):
+    raise ValueError(f"TRENDFLOW_CASSETTE must be 'record' or 'replay', not {MODE!r}")
+RECORDING = MODE == 'record'
+REPLAYING = MODE == 'replay'
+ACTIVE = RECORDING or REPLAYING
+
+CASSETTE_DIR = os.getenv('TRENDFLOW_CASSETTE_DIR', 'cassettes')
+LATENCY = float(os.getenv('TRENDFLOW_CASSETTE_LATENCY_MS', '0')) / 1000
+
+_SECRET_PARAMS = {'apikey', 'api_key', 'token', 'access_token', 'key'}
+_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+# stored bodies are already decoded, so their transfer headers no longer apply
+_DROP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'set-cookie'}
+_write_lock = threading.Lock()
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """Replay was asked for something that was never recorded."""
+
+
+def _scrub(url: str) -> str:
+    """`url` without credential query parameters, params sorted."""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in _SECRET_PARAMS)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _key(*parts) -> str:
+    text = _DATE.sub('DATE', ' '.join(str(p) for p in parts))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _paths(group: str, key: str):
+    base = os.path.join(CASSETTE_DIR, group, key)
+    return base + '.json', base + '.body'
+
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+class CassetteAdapter(HTTPAdapter):
+    """Transport adapter that records real responses, or serves recorded ones."""
+
+    def send(self, request, **kwargs):
+        url = _scrub(request.url)
+        group = urlsplit(request.url).netloc.replace(':', '_')
+        meta_path, body_path = _paths(group, _key(request.method, url))
+        if REPLAYING:
+            return self._replay(request, meta_path, body_path)
+
+        response = super().send(request, **kwargs)
+        body = response.content  # read it all so it can be written
+        headers = {k: v for k, v in response.headers.items()
+                   if k.lower() not in _DROP_HEADERS}
+        meta = {'method': request.method, 'url': url,
+                'status': response.status_code, 'headers': headers}
+        with _write_lock:
+            _write(body_path, body)
+            _write(meta_path, json.dumps(meta, indent=1).encode('utf-8'))
+        return response
+
+    def _replay(self, request, meta_path, body_path):
+        try:
+            with open(meta_path) as fh:
+                meta = json.load(fh)
+            with open(body_path, 'rb') as fh:
+                body = fh.read()
+        except OSError:
+            raise CassetteMiss(f"no recorded response for {request.method} "
+                               f"{_scrub(request.url)}", request=request)
+        if LATENCY:
+            time.sleep(LATENCY)
+
+        response = requests.Response()
+        response.status_code = meta['status']
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.reason = ''
+        response.request = request
+        response.connection = self
+        return response
+
+
+# ── Function calls (yfinance) ─────────────────────────────────────────────────
+def call(name: str, fn, *args, **kwargs):
+    """
+    `fn(*args, **kwargs)`, recorded or replayed under `name` when a cassette is
+    active. `name` must identify the call (e.g. include the ticker); results
+    are pickled, so they must be picklable.
+    """
+    if not ACTIVE:
+        return fn(*args, **kwargs)
+    path = os.path.join(CASSETTE_DIR, 'calls', _key(name) + '.pkl')
+    if REPLAYING:
+        if LATENCY:
+            time.sleep(LATENCY)
+        try:
+            with open(path, 'rb') as fh:
+                return pickle.load(fh)
+        except OSError:
+            raise CassetteMiss(f"no recorded result for {name}")
+    result = fn(*args, **kwargs)
+    with _write_lock:
+        _write(path, pickle.dumps(result))
+    return result
@@ -1,6 +1,8 @@
 import requests
 from datetime import datetime
 
+from data_collection import http_client
+
 BASE_URL = 'https://dev.to/api/articles'
 
 
@@ -13,7 +15,7 @@ def collect_devto(per_page=50):
         if tag:
             params['tag'] = tag
         try:
-            response = requests.get(BASE_URL, params=params, timeout=10)
+            response = http_client.get(BASE_URL, params=params, timeout=10)
             response.raise_for_status()
             articles = response.json()
             for a in articles:
@@ -3,6 +3,8 @@ import os
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+from data_collection import http_client
+
 load_dotenv()
 
 BASE_URL = 'https://api.github.com/search/repositories'
@@ -29,7 +31,7 @@ def collect_github_trending(days_back=1, per_page=50):
     }
 
     try:
-        response = requests.get(BASE_URL, headers=headers, params=params, timeout=10)
+        response = http_client.get(BASE_URL, headers=headers, params=params, timeout=10)
         response.raise_for_status()
         items = response.json().get('items', [])
         results = []
@@ -0,0 +1,191 @@
+"""
+Hacker News collector.
+
+The Firebase API exposes one item per request, so fetching a front page one
+item at a time spends nearly all of its wall-clock time waiting on round trips.
+Here the item requests are fanned out over a small thread pool that shares the
+host's keep-alive session from `http_client`, so a full page of items comes
+back in a couple of seconds.
+
+Depth is configurable — any of the `top` / `new` / `best` feeds, up to the
+500 IDs the API publishes — either per call or via the environment:
+
+    TRENDFLOW_HN_FEED=best TRENDFLOW_HN_LIMIT=500 python test_hn_api.py
+
+By default the crawl is incremental (TRENDFLOW_HN_MODE=full re-reads the whole
+feed every run). Crawl state remembers which item IDs were already fetched, so
+only unseen IDs are requested. Newly seen stories also join a "hot" set that is
+re-polled on a decaying schedule: an item whose score or comment count is still
+climbing is checked again after the base interval, one that has levelled off
+waits twice as long each time, and items drop out once the interval or their
+age passes the cut-off. Re-polled items come back flagged `_refresh` so the
+pipeline updates the stored score/num_comments instead of skipping them.
+The crawl state describes what one database holds, so the pipeline keeps it
+in that database's app_state and passes it in (`state`); it stores the
+updated state in the same transaction as the items, so items whose write
+failed are fetched again next run.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from data_collection import http_client
+
+BASE_URL = 'https://hacker-news.firebaseio.com/v0'
+FEEDS = {
+    'top': 'topstories',    # up to 500 IDs
+    'new': 'newstories',    # up to 500 IDs
+    'best': 'beststories',  # up to 200 IDs
+}
+
+DEFAULT_FEED = os.getenv('TRENDFLOW_HN_FEED', 'top')
+DEFAULT_LIMIT = int(os.getenv('TRENDFLOW_HN_LIMIT', '100'))
+MAX_WORKERS = int(os.getenv('TRENDFLOW_HN_WORKERS', '16'))
+ITEM_TIMEOUT = float(os.getenv('TRENDFLOW_HN_TIMEOUT', '5'))
+INCREMENTAL = os.getenv('TRENDFLOW_HN_MODE', 'incremental') != 'full'
+
+# Hot-item refresh schedule
+HOT_BASE_INTERVAL = 30 * 60        # first re-poll 30 min after an item is seen
+HOT_MAX_INTERVAL = 8 * 3600        # stop once polls are this far apart…
+HOT_MAX_AGE = 48 * 3600            # …or the item is two days old
+HOT_MIN_GAIN = 5                   # points + comments per poll that count as climbing
+SEEN_LIMIT = 5000                  # item IDs remembered (a few days of top/new feeds)
+
+
+def fetch_story_ids(feed: str = 'top', timeout: float = 10) -> list:
+    """Return the ranked item IDs published for a feed ('top', 'new' or 'best')."""
+    if feed not in FEEDS:
+        raise ValueError(f"Unknown HN feed {feed!r} (expected one of {sorted(FEEDS)})")
+    # rankings change minute to minute — never serve them from the cache
+    response = http_client.get(f'{BASE_URL}/{FEEDS[feed]}.json', timeout=timeout, cache=False)
+    response.raise_for_status()
+    return response.json() or []
+
+
+def fetch_item(item_id: int, timeout: float = ITEM_TIMEOUT):
+    """Fetch one item; returns None on any error so one slow item can't sink the batch."""
+    try:
+        response = http_client.get(f'{BASE_URL}/item/{item_id}.json', timeout=timeout,
+                                   cache=False)
+        response.raise_for_status()
+        return response.json()
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+
+def _to_post(item) -> dict:
+    """Map an HN item onto the Story-compatible dict the pipeline saves."""
+    if not item or item.get('dead') or item.get('deleted') or not item.get('title'):
+        return None
+    return {
+        'title': item['title'],
+        'score': item.get('score', 0),
+        'num_comments': item.get('descendants', 0),
+        # Ask/Show HN posts have no external link; their discussion page is
+        # their identity (and what lets them be deduplicated and refreshed)
+        'url': item.get('url') or f"https://news.ycombinator.com/item?id={item['id']}",
+        'platform': 'hackernews',
+    }
+
+
+def _fetch_many(ids, max_workers: int, timeout: float) -> list:
+    """Fetch items concurrently; result order matches `ids`."""
+    if not ids:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda i: fetch_item(i, timeout), ids))
+
+
+def _reschedule(hot: dict, item_id: str, item, now: float):
+    """Update one hot entry after a re-poll; drop it once it has cooled off."""
+    entry = hot[item_id]
+    if item is None:
+        return  # transient error: keep the schedule, try again next run
+    score, comments = item.get('score', 0), item.get('descendants', 0)
+    gain = (score - entry['score']) + (comments - entry['comments'])
+    entry['score'], entry['comments'] = score, comments
+    entry['interval'] = HOT_BASE_INTERVAL if gain >= HOT_MIN_GAIN else entry['interval'] * 2
+    entry['next'] = now + entry['interval']
+    if (item.get('dead') or item.get('deleted') or entry['interval'] > HOT_MAX_INTERVAL
+            or now - entry['first'] > HOT_MAX_AGE):
+        del hot[item_id]
+
+
+def collect_hn_incremental(state: dict, feed: str = None, limit: int = None,
+                           max_workers: int = None, timeout: float = None):
+    """
+    Fetch only the feed's unseen items plus the hot items due a re-poll, given
+    the `state` the previous call returned ({} the first time). Returns (posts,
+    new state): new stories first in feed rank order, refreshed ones carrying
+    `_refresh`. The caller stores the new state once the posts are committed.
+    """
+    feed = feed or DEFAULT_FEED
+    limit = limit or DEFAULT_LIMIT
+    max_workers = max_workers or MAX_WORKERS
+    timeout = timeout or ITEM_TIMEOUT
+
+    seen = list(state.get('seen', []))
+    hot = {k: dict(v) for k, v in state.get('hot', {}).items()}   # str(item id) -> schedule entry
+    seen_set = set(seen)
+    now = time.time()
+
+    story_ids = fetch_story_ids(feed)[:limit]
+    new_ids = [i for i in story_ids if i not in seen_set]
+    due_ids = [i for i, entry in hot.items() if entry['next'] <= now]
+
+    items = _fetch_many(new_ids + [int(i) for i in due_ids], max_workers, timeout)
+    new_items, due_items = items[:len(new_ids)], items[len(new_ids):]
+
+    posts = []
+    for item_id, item in zip(new_ids, new_items):
+        if item is None:
+            continue  # not marked seen, so it is retried next run
+        seen.append(item_id)
+        post = _to_post(item)
+        if post:
+            posts.append(post)
+            hot[str(item_id)] = {'first': now, 'next': now + HOT_BASE_INTERVAL,
+                                 'interval': HOT_BASE_INTERVAL, 'score': post['score'],
+                                 'comments': post['num_comments']}
+
+    refreshed = 0
+    for item_id, item in zip(due_ids, due_items):
+        post = _to_post(item)
+        if post:
+            posts.append({**post, '_refresh': True})
+            refreshed += 1
+        _reschedule(hot, item_id, item, now)
+
+    print(f"  HN {feed} (incremental): {len(posts) - refreshed} new of {len(story_ids)} IDs, "
+          f"{refreshed} hot items refreshed, {len(hot)} still hot")
+    return posts, {'seen': seen[-SEEN_LIMIT:], 'hot': hot}
+
+
+def collect_hn(feed: str = None, limit: int = None, max_workers: int = None,
+               timeout: float = None, incremental: bool = None, state: dict = None):
+    """
+    Fetch the first `limit` stories of an HN feed concurrently.
+    Returns Story-compatible dicts in feed rank order.
+
+    Given a crawl `state` and `incremental` (the default, see TRENDFLOW_HN_MODE),
+    only items not fetched before are requested, plus re-polls of hot items,
+    and (posts, new state) is returned as `collect_hn_incremental` does.
+    """
+    incremental = INCREMENTAL if incremental is None else incremental
+    if incremental and state is not None:
+        return collect_hn_incremental(state, feed, limit, max_workers, timeout)
+
+    feed = feed or DEFAULT_FEED
+    limit = limit or DEFAULT_LIMIT
+    max_workers = max_workers or MAX_WORKERS
+    timeout = timeout or ITEM_TIMEOUT
+
+    story_ids = fetch_story_ids(feed)[:limit]
+    # _fetch_many keeps feed order, so rank is preserved in the result
+    items = _fetch_many(story_ids, max_workers, timeout)
+    posts = [p for p in map(_to_post, items) if p]
+
+    print(f"  HN {feed}: {len(posts)} stories from {len(story_ids)} IDs")
+    return posts
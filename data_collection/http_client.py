@@ -0,0 +1,269 @@
+"""
+Shared HTTP layer for the collectors.
+
+Every collector used to call `requests.get` directly: a fresh connection per
+request and a full download every run, even when a feed had not changed. This
+module gives them one place to go through instead:
+
+  * pooled keep-alive sessions, one per host, safe to share between the
+    fetcher threads in `run_pipeline`
+  * conditional GETs — the stored ETag / Last-Modified is sent back, and a
+    `304 Not Modified` reuses the body already on disk
+  * a TTL-bounded on-disk response cache with size-based (LRU) eviction
+  * per-host rate limiting with retry on throttling (see `rate_limit`)
+  * record/replay of all traffic for offline benchmarks (see `cassette`)
+
+Bodies are streamed straight to disk, so large feeds never have to sit in
+memory. Tune with TRENDFLOW_HTTP_TTL (seconds a response is served without
+revalidating), TRENDFLOW_HTTP_CACHE_MB and TRENDFLOW_HTTP_CACHE_DAYS.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from config import CACHE_DIR
+from data_collection import cassette, rate_limit
+
+HTTP_CACHE_DIR = os.path.join(CACHE_DIR, 'http')
+DEFAULT_TTL = float(os.getenv('TRENDFLOW_HTTP_TTL', '300'))
+MAX_CACHE_BYTES = int(float(os.getenv('TRENDFLOW_HTTP_CACHE_MB', '256')) * 1024 * 1024)
+MAX_ENTRY_AGE = float(os.getenv('TRENDFLOW_HTTP_CACHE_DAYS', '7')) * 86400
+POOL_SIZE = 32
+USER_AGENT = 'TrendFlow/1.0'
+
+_EVICT_EVERY = 50          # stores between eviction sweeps
+_CHUNK = 64 * 1024
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_store_count = 0
+_evict_lock = threading.Lock()
+
+
+# ── Sessions ──────────────────────────────────────────────────────────────────
+def get_session(url: str) -> requests.Session:
+    """Return the shared keep-alive session for `url`'s host."""
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter_cls = cassette.CassetteAdapter if cassette.ACTIVE else HTTPAdapter
+            adapter = adapter_cls(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            _sessions[host] = session
+    return session
+
+
+# ── Responses ─────────────────────────────────────────────────────────────────
+class Response:
+    """
+    The subset of `requests.Response` the collectors use, backed either by a
+    file in the cache or by bytes in memory.
+    """
+
+    def __init__(self, url, status_code, headers, body_path=None, body=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self._body_path = body_path
+        self._body = body
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def content(self) -> bytes:
+        if self._body is None:
+            with open(self._body_path, 'rb') as fh:
+                self._body = fh.read()
+        return self._body
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def open(self):
+        """A binary file object over the body, for streaming parsers."""
+        if self._body is None and self._body_path:
+            return open(self._body_path, 'rb')
+        return io.BytesIO(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} error for url: {self.url}", response=self)
+
+
+# ── Disk cache ────────────────────────────────────────────────────────────────
+def _cache_key(url: str, params) -> str:
+    prepared = requests.Request('GET', url, params=params).prepare()
+    return hashlib.sha1(prepared.url.encode('utf-8')).hexdigest()
+
+
+def _paths(key: str):
+    base = os.path.join(HTTP_CACHE_DIR, key[:2], key)
+    return base + '.json', base + '.body'
+
+
+def _load_meta(meta_path: str):
+    try:
+        with open(meta_path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path: str, meta: dict):
+    tmp = f"{meta_path}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w') as fh:
+        json.dump(meta, fh)
+    os.replace(tmp, meta_path)
+
+
+def _cached_response(url, meta, body_path) -> Response:
+    os.utime(body_path)  # mark as recently used for LRU eviction
+    return Response(url, meta['status'], meta['headers'], body_path=body_path)
+
+
+def _store(url, raw, meta_path, body_path) -> Response:
+    """Stream a 200 response body to disk and record its validators."""
+    os.makedirs(os.path.dirname(body_path), exist_ok=True)
+    tmp = f"{body_path}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as fh:
+        for chunk in raw.iter_content(_CHUNK):
+            fh.write(chunk)
+    os.replace(tmp, body_path)
+
+    keep = ('ETag', 'Last-Modified', 'Content-Type')
+    headers = {k: raw.headers[k] for k in keep if k in raw.headers}
+    _write_meta(meta_path, {'status': raw.status_code, 'headers': headers,
+                            'stored_at': time.time()})
+    _maybe_evict()
+    return Response(url, raw.status_code, raw.headers, body_path=body_path)
+
+
+def _maybe_evict():
+    global _store_count
+    with _evict_lock:
+        _store_count += 1
+        if _store_count % _EVICT_EVERY != 1:
+            return
+    evict()
+
+
+def evict(max_bytes: int = None, max_age: float = None) -> int:
+    """
+    Drop entries unused for longer than `max_age` seconds, then the least
+    recently used ones until the cache fits in `max_bytes`. Returns the
+    number of entries removed.
+    """
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    max_age = MAX_ENTRY_AGE if max_age is None else max_age
+    if not os.path.isdir(HTTP_CACHE_DIR):
+        return 0
+
+    entries = []
+    for root, _, files in os.walk(HTTP_CACHE_DIR):
+        for name in files:
+            if name.endswith('.body'):
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+    entries.sort()  # oldest use first
+    total = sum(size for _, size, _ in entries)
+    cutoff = time.time() - max_age
+    removed = 0
+    for used_at, size, path in entries:
+        if used_at >= cutoff and total <= max_bytes:
+            break
+        for p in (path, path[:-len('.body')] + '.json'):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        total -= size
+        removed += 1
+    return removed
+
+
+# ── Network ───────────────────────────────────────────────────────────────────
+def _send(session, url, params, headers, timeout):
+    """
+    Send one GET under the host's rate limit. A throttled response (429, or an
+    exhausted budget) is retried once the host's wait is over, up to
+    MAX_RETRIES times; after that the throttled response is returned as-is.
+    """
+    # replayed responses never reach the host, so there is nothing to pace
+    limiter = None if cassette.REPLAYING else rate_limit.limiter_for(urlsplit(url).netloc)
+    for attempt in range(rate_limit.MAX_RETRIES + 1):
+        if limiter is not None:
+            limiter.acquire()
+        raw = session.get(url, params=params, headers=headers, timeout=timeout, stream=True)
+        if (limiter is None or limiter.update(raw.status_code, raw.headers) is None
+                or attempt == rate_limit.MAX_RETRIES):
+            return raw
+        raw.close()
+
+
+# ── Public entry point ────────────────────────────────────────────────────────
+def get(url: str, params=None, headers=None, timeout: float = 10,
+        ttl: float = None, cache: bool = True) -> Response:
+    """
+    GET `url` through the shared session for its host.
+
+    With `cache` on, a stored response younger than `ttl` seconds is returned
+    without touching the network; an older one is revalidated with a
+    conditional GET, and a 304 reuses the stored body. Network errors raise
+    the usual `requests` exceptions (including `rate_limit.RateLimited`).
+    The cache is skipped while a cassette is recording or replaying.
+    """
+    ttl = DEFAULT_TTL if ttl is None else ttl
+    cache = cache and not cassette.ACTIVE
+    session = get_session(url)
+    send_headers = dict(headers or {})
+
+    meta = None
+    if cache:
+        meta_path, body_path = _paths(_cache_key(url, params))
+        meta = _load_meta(meta_path) if os.path.exists(body_path) else None
+        if meta:
+            if time.time() - meta['stored_at'] < ttl:
+                return _cached_response(url, meta, body_path)
+            if meta['headers'].get('ETag'):
+                send_headers['If-None-Match'] = meta['headers']['ETag']
+            if meta['headers'].get('Last-Modified'):
+                send_headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+    raw = _send(session, url, params, send_headers, timeout)
+    try:
+        if meta and raw.status_code == 304:
+            for k in ('ETag', 'Last-Modified'):
+                if k in raw.headers:
+                    meta['headers'][k] = raw.headers[k]
+            meta['stored_at'] = time.time()
+            _write_meta(meta_path, meta)
+            return _cached_response(raw.url, meta, body_path)
+        if cache and raw.status_code == 200:
+            return _store(raw.url, raw, meta_path, body_path)
+        return Response(raw.url, raw.status_code, raw.headers, body=raw.content)
+    finally:
+        raw.close()
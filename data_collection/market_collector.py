@@ -9,59 +9,100 @@ dashboard falls back to the synthetic prices written by seed_data.py.
 from datetime import datetime, timedelta
 
 from config import TRACKED_TICKERS, TICKER_NAMES  # single source of truth
+from data_collection import cassette
 
+# Re-fetch this far behind the last stored bar, so the first new bar has a
+# previous close to compute its return from (covers weekends and holidays).
+_OVERLAP_DAYS = 7
+_FIELDS = ['open', 'close', 'high', 'low', 'volume']
 
-def collect_market_data(tickers=None, days_back: int = 60) -> list:
+
+def _import_yfinance():
+    """The yfinance module; None when replaying a cassette, which doesn't need it."""
+    if cassette.REPLAYING:
+        return None
+    import yfinance
+    return yfinance
+
+
+def _download_frame(yf, tickers: list, start: datetime, end: datetime):
+    """One multi-ticker download, reshaped to long form: ticker, date, OHLCV."""
+    import pandas as pd
+
+    # keyed on the tickers alone, so a recording replays whatever the dates
+    df = cassette.call(f"yfinance.download {' '.join(tickers)}", lambda: yf.download(
+        tickers, start=start.strftime('%Y-%m-%d'), end=end.strftime('%Y-%m-%d'),
+        progress=False, auto_adjust=True, group_by='ticker', threads=True))
+    if df is None or df.empty:
+        return pd.DataFrame()
+    if not isinstance(df.columns, pd.MultiIndex):
+        # older yfinance returns flat columns for a single ticker
+        df = pd.concat({tickers[0]: df}, axis=1)
+
+    present = [t for t in tickers if t in df.columns.get_level_values(0)]
+    long = pd.concat({t: df[t] for t in present}, names=['ticker', 'date'])
+    long = long.reset_index()
+    long.columns = [str(c).lower() for c in long.columns]
+    return long
+
+
+def collect_market_data(tickers=None, days_back: int = 60, since: dict = None) -> list:
     """
     Fetch daily bars for each ticker. Returns a list of dicts:
     {ticker, date, open, close, high, low, volume, return_pct}
+
+    `since` maps ticker -> date of its last stored bar. Those tickers only get
+    bars from that date on (the last stored bar is refreshed, its return kept
+    correct by a short overlap); others get the full `days_back` window. The
+    whole universe is fetched in one multi-ticker download.
     """
     tickers = tickers or TRACKED_TICKERS
+    since = since or {}
     try:
-        import yfinance as yf
+        import pandas as pd
+        yf = _import_yfinance()
     except ImportError:
         print("  yfinance not installed — skipping live market fetch "
               "(pip install yfinance). Using seeded prices.")
         return []
 
     end = datetime.utcnow()
-    start = end - timedelta(days=days_back)
-    rows = []
-
-    for ticker in tickers:
-        try:
-            df = yf.download(ticker, start=start.strftime('%Y-%m-%d'),
-                             end=end.strftime('%Y-%m-%d'), progress=False,
-                             auto_adjust=True)
-            if df is None or df.empty:
-                print(f"  {ticker}: no data returned")
-                continue
-            df = df.reset_index()
-            prev_close = None
-            for _, r in df.iterrows():
-                # yfinance may return multiindex columns; normalise access
-                def _v(col):
-                    val = r[col]
-                    return float(val.iloc[0]) if hasattr(val, 'iloc') else float(val)
-
-                close = _v('Close')
-                ret = ((close - prev_close) / prev_close * 100) if prev_close else 0.0
-                rows.append({
-                    'ticker': ticker,
-                    'date': r['Date'].to_pydatetime() if hasattr(r['Date'], 'to_pydatetime') else r['Date'],
-                    'open': _v('Open'),
-                    'close': close,
-                    'high': _v('High'),
-                    'low': _v('Low'),
-                    'volume': _v('Volume'),
-                    'return_pct': ret,
-                })
-                prev_close = close
-            print(f"  {ticker}: {len(df)} daily bars")
-        except Exception as e:
-            print(f"  {ticker} fetch error: {e}")
+    full_start = end - timedelta(days=days_back)
+    # One download for the whole universe, from the earliest start any ticker
+    # needs; the extra bars the others get are trimmed below.
+    start = min((since[t] - timedelta(days=_OVERLAP_DAYS)) if since.get(t) else full_start
+                for t in tickers)
+    try:
+        bars = _download_frame(yf, list(tickers), start, end)
+    except Exception as e:
+        print(f"  Market fetch error: {e}")
+        return []
+    if bars.empty:
+        print("  Market: no data returned")
+        return []
 
-    print(f"  Market: {len(rows)} total price rows")
+    bars = bars.dropna(subset=['close'])
+    bars['date'] = pd.to_datetime(bars['date'])
+    if bars['date'].dt.tz is not None:
+        bars['date'] = bars['date'].dt.tz_localize(None)
+    bars = bars.sort_values(['ticker', 'date']).reset_index(drop=True)
+    bars['return_pct'] = bars.groupby('ticker')['close'].pct_change().mul(100).fillna(0.0)
+
+    # Incremental tickers: keep bars from the last stored one on, but never the
+    # first fetched bar, whose return has no previous close behind it.
+    last_stored = pd.to_datetime(bars['ticker'].map(since))
+    first_fetched = ~bars.duplicated('ticker')
+    keep = last_stored.isna() | ((bars['date'] >= last_stored) & ~first_fetched)
+    bars = bars.loc[keep, ['ticker', 'date'] + _FIELDS + ['return_pct']]
+    bars[_FIELDS + ['return_pct']] = bars[_FIELDS + ['return_pct']].astype(float)
+
+    rows = bars.to_dict('records')
+    for row in rows:
+        row['date'] = row['date'].to_pydatetime()
+    missing = sorted(set(tickers) - set(bars['ticker']))
+    if missing:
+        print(f"  no new bars for: {', '.join(missing[:20])}{' …' if len(missing) > 20 else ''}")
+    print(f"  Market: {len(rows)} price rows for {bars['ticker'].nunique()} tickers")
     return rows
 
 
@@ -100,7 +141,7 @@ def collect_ticker_news(tickers=None, max_per_ticker: int = 15) -> list:
     """
     tickers = tickers or TRACKED_TICKERS
     try:
-        import yfinance as yf
+        yf = _import_yfinance()
     except ImportError:
         print("  yfinance not installed — skipping ticker news.")
         return []
@@ -108,7 +149,7 @@ def collect_ticker_news(tickers=None, max_per_ticker: int = 15) -> list:
     results = []
     for ticker in tickers:
         try:
-            items = yf.Ticker(ticker).news or []
+            items = cassette.call(f'yfinance.news {ticker}', lambda: yf.Ticker(ticker).news) or []
             got = 0
             for item in items[:max_per_ticker]:
                 title, url, ts = _news_item_fields(item)
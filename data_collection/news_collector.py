@@ -2,8 +2,10 @@ import os
 import requests
 from dotenv import load_dotenv
 from datetime import datetime
-from database.db_setup import getSession
-from database.models import Article
+from database.db_setup import db_connection, getSession
+from database.dedup import UrlIndex, url_hash
+from database import bulk
+from data_collection import http_client
 
 load_dotenv()
 
@@ -48,7 +50,7 @@ def search_news(keywords, max_results=10):
     }
     
     try:
-        response = requests.get(url, params=params)
+        response = http_client.get(url, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
 
@@ -80,22 +82,23 @@ def save_articles(articles, session=None):
         session = getSession()
         close_session = True
 
-    created = 0
-    for a in articles:
-        if not a.get('url'):
+    url_index = UrlIndex(session, use_bloom=False)
+    hashes = [url_hash(a.get('url')) for a in articles]
+    fresh = url_index.filter_new(hashes)
+    rows = []
+    for a, h in zip(articles, hashes):
+        if h not in fresh:
             continue
-        exists = session.query(Article).filter(Article.url == a['url']).first()
-        if exists:
-            continue
-        art = Article(
-            title=a.get('title'),
-            url=a.get('url'),
-            source=a.get('source'),
-            published_at=a.get('published_at'),
-            platform='news'
-        )
-        session.add(art)
-        created += 1
+        fresh.discard(h)
+        rows.append({
+            'title': a.get('title'),
+            'url': a.get('url'),
+            'url_hash': h,
+            'source': a.get('source'),
+            'published_at': a.get('published_at'),
+            'platform': 'news',
+        })
+    created = bulk.insert_articles(session, rows)
 
     session.commit()
     if close_session:
@@ -109,6 +112,7 @@ if __name__ == "__main__":
     print(f"Searching news for: {kws}")
     arts = search_news(kws, max_results=20)
     print(f"Found {len(arts)} articles; saving to DB...")
+    db_connection()
     created = save_articles(arts)
     print(f"Saved {created} new articles.")
 
@@ -0,0 +1,148 @@
+"""
+Per-host rate limiting for the collectors.
+
+Every request `http_client` sends first takes a token from its host's bucket.
+Buckets start from the documented limits below and then follow what the server
+reports:
+
+  * `X-RateLimit-Remaining` / `X-RateLimit-Reset` (GitHub, Reddit) re-pace the
+    bucket to spend the remaining budget evenly over the rest of the window,
+    instead of bursting through it and then hitting a wall
+  * `429` (or GitHub's `403` with an exhausted budget) pauses the host until
+    `Retry-After` / the reset time — or, with no hint, backs off exponentially —
+    and halves the rate; successes then creep it back up
+
+A request that would have to wait longer than TRENDFLOW_RATE_MAX_WAIT seconds
+(default 120) raises `RateLimited` — a `requests` exception, so collectors
+report it the way they report any other fetch error. Override the per-host
+limits with TRENDFLOW_RATE_LIMITS='{"www.reddit.com": [0.5, 5]}'
+(requests per second, burst).
+"""
+import json
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# host -> (requests per second, burst). None = no client-side limit.
+DEFAULT_LIMITS = {
+    'www.reddit.com': (10 / 60, 6),          # unauthenticated JSON API: ~10/min
+    'api.github.com': (10 / 60, 5),          # search API, unauthenticated: 10/min
+    'newsapi.org': (100 / 86400, 5),         # developer plan: 100/day
+    'dev.to': (3, 5),
+    'hacker-news.firebaseio.com': None,      # Firebase: no published limit
+}
+FALLBACK_LIMIT = (5, 10)
+MAX_WAIT = float(os.getenv('TRENDFLOW_RATE_MAX_WAIT', '120'))
+MAX_RETRIES = 3
+
+_overrides = json.loads(os.getenv('TRENDFLOW_RATE_LIMITS', '{}') or '{}')
+
+
+class RateLimited(requests.exceptions.RequestException):
+    """The host's budget can't be met within MAX_WAIT seconds."""
+
+
+def _header_float(headers, name):
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _retry_after(headers, now: float):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - now, 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+class HostLimiter:
+    """Token bucket for one host, re-paced from the server's rate-limit headers."""
+
+    def __init__(self, rate: float, burst: float):
+        self.ceiling = rate          # configured or server-reported max rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.blocked_until = 0.0     # wall-clock time the host asked us to wait for
+        self.failures = 0
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self, max_wait: float = None):
+        """Block until a request may be sent; raise RateLimited past `max_wait`."""
+        deadline = time.time() + (MAX_WAIT if max_wait is None else max_wait)
+        while True:
+            with self._lock:
+                self._refill()
+                wait = self.blocked_until - time.time()
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            if time.time() + wait > deadline:
+                raise RateLimited(f"rate limit would need a {wait:.0f}s wait")
+            time.sleep(wait)
+
+    def update(self, status: int, headers) -> float:
+        """
+        Adapt to a response. Returns how long to wait before retrying it,
+        or None if it was not throttled.
+        """
+        now = time.time()
+        remaining = _header_float(headers, 'X-RateLimit-Remaining')
+        reset = _header_float(headers, 'X-RateLimit-Reset')
+        if reset is not None and reset > 1e9:
+            reset -= now                       # GitHub: epoch seconds; Reddit: seconds left
+        with self._lock:
+            self._refill()
+            if remaining is not None and reset is not None and reset > 0:
+                # spread what is left of this window evenly over the rest of it
+                self.ceiling = max(remaining / reset, 1e-6)
+                self.rate = min(self.rate, self.ceiling) if self.failures else self.ceiling
+                self.tokens = min(self.tokens, remaining)
+
+            exhausted = status == 403 and remaining == 0
+            if status not in (429, 503) and not exhausted:
+                self.failures = 0
+                self.rate = min(self.ceiling, self.rate * 1.25)
+                return None
+
+            self.failures += 1
+            self.rate = max(self.rate / 2, 1e-6)
+            delay = _retry_after(headers, now)
+            if delay is None and exhausted and reset is not None:
+                delay = max(reset, 0.0)
+            if delay is None:
+                delay = min(2 ** self.failures, 60)
+            self.blocked_until = max(self.blocked_until, now + delay)
+            return delay
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(host: str):
+    """The shared limiter for `host`, or None if the host is unlimited."""
+    with _limiters_lock:
+        if host not in _limiters:
+            limit = _overrides.get(host, DEFAULT_LIMITS.get(host, FALLBACK_LIMIT))
+            _limiters[host] = HostLimiter(*limit) if limit else None
+        return _limiters[host]
@@ -1,6 +1,8 @@
 import requests
 from datetime import datetime
 
+from data_collection import http_client
+
 SUBREDDITS = ['technology', 'programming', 'artificial', 'science', 'worldnews', 'MachineLearning']
 HEADERS = {'User-Agent': 'TrendFlow/1.0 (data pipeline project)'}
 
@@ -9,7 +11,7 @@ def fetch_reddit_posts(subreddit, limit=50, time_filter='day'):
     url = f'https://www.reddit.com/r/{subreddit}/top.json'
     params = {'limit': limit, 't': time_filter}
     try:
-        response = requests.get(url, headers=HEADERS, params=params, timeout=10)
+        response = http_client.get(url, headers=HEADERS, params=params, timeout=10)
         response.raise_for_status()
         posts = response.json().get('data', {}).get('children', [])
         results = []
@@ -1,12 +1,23 @@
 """
 RSS collector with two backends:
-  1. feedparser (if importable)
-  2. requests + xml.etree.ElementTree fallback (always available)
+  1. streaming xml.etree.ElementTree.iterparse (always available)
+  2. feedparser (if importable) for feeds too malformed to stream
+
+Feeds are downloaded concurrently through `http_client`, so an unchanged feed
+costs a 304. The streaming parser reads entries one at a time straight off the
+cached body and discards each once handled, so memory stays flat however large
+the feed. It also remembers the newest entries it saw per feed and stops as
+soon as it reaches one of them: steady-state runs only touch new entries.
+Feeds ordered by rank (RANKED_FEEDS) are the exception and are read in full.
+The markers describe what one database holds, so the pipeline keeps them in
+that database's app_state and passes them in (`state`); it stores the updated
+markers in the same transaction as the entries, so entries whose write failed
+are read again next run.
 """
-import requests
 import xml.etree.ElementTree as ET
-from datetime import datetime
-from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from data_collection import http_client
 
 # Try feedparser; fall back silently if broken (e.g. Python 3.11 + old feedparser)
 try:
@@ -25,92 +36,145 @@ RSS_FEEDS = [
     ("HN Best (RSS)", "https://hnrss.org/best"),
     ("VentureBeat AI", "https://venturebeat.com/category/ai/feed/"),
 ]
+# Feeds listed by rank rather than newest first: a new entry can sit below one
+# already seen, so these are always read in full (URL dedup drops the repeats).
+RANKED_FEEDS = {"https://hnrss.org/best"}
+
+MAX_WORKERS = 8
+# How many of a feed's newest entry keys to remember. Any one of them ends the
+# next parse, so a single removed/edited entry doesn't force a full re-read.
+_SEEN_KEYS = 5
+
+
+def _local(tag: str) -> str:
+    """'{http://www.w3.org/2005/Atom}entry' -> 'entry'."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _story(title: str, link: str, source_name: str) -> dict:
+    return {
+        'title': title,
+        'url': link.strip(),
+        'score': 0,
+        'num_comments': 0,
+        'platform': 'rss',
+        '_source': source_name,
+    }
+
+
+def _entry_fields(elem):
+    """(title, link, key) for an RSS <item> or Atom <entry>; key identifies the entry."""
+    title = link = guid = ''
+    for child in elem:
+        name = _local(child.tag)
+        if name == 'title':
+            title = (child.text or '').strip()
+        elif name == 'link':
+            # Atom: <link rel="alternate" href="…"/>; RSS: <link>…</link>
+            if child.get('rel', 'alternate') == 'alternate':
+                link = link or child.get('href') or child.text or ''
+        elif name in ('guid', 'id'):
+            guid = (child.text or '').strip()
+    return title, link.strip(), guid or link.strip() or title
+
+
+def _stream_items(fh, source_name: str, max_items: int, seen: set):
+    """
+    Parse a feed incrementally. Returns (stories, newest entry keys, stopped_early).
+    Stops at max_items or at the first entry whose key is in `seen`.
+    """
+    results, keys = [], []
+    parents = []
+    handled = 0
+    for event, elem in ET.iterparse(fh, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+        parents.pop()
+        if _local(elem.tag) not in ('item', 'entry'):
+            continue
 
-_RSS_NS = {
-    'atom': 'http://www.w3.org/2005/Atom',
-    'content': 'http://purl.org/rss/1.0/modules/content/',
-}
-
-
-def _parse_date_str(s: str) -> datetime:
-    if not s:
-        return datetime.utcnow()
-    try:
-        return parsedate_to_datetime(s).replace(tzinfo=None)
-    except Exception:
-        return datetime.utcnow()
-
-
-def _fetch_feedparser(source_name: str, feed_url: str, max_items: int) -> list:
-    feed = _feedparser.parse(feed_url)
-    results = []
+        title, link, key = _entry_fields(elem)
+        # drop the handled entry so the tree never grows past one item
+        elem.clear()
+        if parents:
+            parents[-1].remove(elem)
+
+        if key in seen:
+            return results, keys, True
+        if len(keys) < _SEEN_KEYS:
+            keys.append(key)
+        if title:
+            results.append(_story(title, link, source_name))
+        handled += 1
+        if handled >= max_items:
+            break
+    return results, keys, False
+
+
+def _fetch_feedparser(source_name: str, content: bytes, max_items: int, seen: set):
+    feed = _feedparser.parse(content)
+    results, keys = [], []
     for entry in feed.entries[:max_items]:
+        link = entry.get('link', '')
+        key = entry.get('id') or link or entry.get('title', '')
+        if key in seen:
+            return results, keys, True
+        if len(keys) < _SEEN_KEYS:
+            keys.append(key)
         title = entry.get('title', '').strip()
-        if not title:
-            continue
-        pub = datetime.utcnow()
-        if hasattr(entry, 'published_parsed') and entry.published_parsed:
-            try:
-                pub = datetime(*entry.published_parsed[:6])
-            except Exception:
-                pass
-        results.append({
-            'title': title,
-            'url': entry.get('link', ''),
-            'score': 0,
-            'num_comments': 0,
-            'platform': 'rss',
-            '_source': source_name,
-        })
-    return results
-
-
-def _fetch_xml(source_name: str, feed_url: str, max_items: int) -> list:
-    headers = {'User-Agent': 'TrendFlow/1.0'}
-    resp = requests.get(feed_url, timeout=10, headers=headers)
-    resp.raise_for_status()
-    root = ET.fromstring(resp.content)
+        if title:
+            results.append(_story(title, link, source_name))
+    return results, keys, False
 
-    # Handle both RSS 2.0 and Atom
-    items = root.findall('.//item') or root.findall('.//{http://www.w3.org/2005/Atom}entry')
 
-    results = []
-    for item in items[:max_items]:
-        # Title
-        title_el = item.find('title') or item.find('{http://www.w3.org/2005/Atom}title')
-        title = (title_el.text or '').strip() if title_el is not None else ''
-        if not title:
-            continue
-
-        # Link
-        link_el = item.find('link') or item.find('{http://www.w3.org/2005/Atom}link')
-        link = ''
-        if link_el is not None:
-            link = link_el.get('href') or link_el.text or ''
-
-        results.append({
-            'title': title,
-            'url': link.strip(),
-            'score': 0,
-            'num_comments': 0,
-            'platform': 'rss',
-            '_source': source_name,
-        })
-    return results
-
-
-def collect_rss(max_per_feed: int = 20) -> list:
-    """Fetch articles from curated RSS feeds. Returns Story-compatible dicts."""
-    results = []
-    for source_name, feed_url in RSS_FEEDS:
+def _fetch_feed(source_name: str, feed_url: str, max_items: int, seen: set):
+    """Download one feed (conditionally) and parse only the entries newer than `seen`."""
+    resp = http_client.get(feed_url, timeout=10)
+    resp.raise_for_status()
+    try:
+        with resp.open() as fh:
+            return _stream_items(fh, source_name, max_items, seen)
+    except ET.ParseError:
+        if not _HAVE_FEEDPARSER:
+            raise
+        # feedparser is forgiving about broken markup the strict parser rejects
+        return _fetch_feedparser(source_name, resp.content, max_items, seen)
+
+
+def collect_rss(max_per_feed: int = 20, state: dict = None):
+    """
+    Fetch new articles from the curated RSS feeds. Returns Story-compatible dicts.
+    Given the `state` a previous call returned, only entries newer than it are
+    read and the result is (articles, new state) for the caller to store once
+    the articles are committed.
+    """
+    incremental = state is not None
+    state = dict(state or {})
+
+    def _one(feed):
+        source_name, feed_url = feed
+        seen = set() if feed_url in RANKED_FEEDS else set(state.get(feed_url, []))
         try:
-            if _HAVE_FEEDPARSER:
-                items = _fetch_feedparser(source_name, feed_url, max_per_feed)
-            else:
-                items = _fetch_xml(source_name, feed_url, max_per_feed)
-            results.extend(items)
+            return feed, _fetch_feed(source_name, feed_url, max_per_feed, seen)
         except Exception as e:
             print(f"RSS fetch error ({source_name}): {e}")
+            return feed, None
+
+    results = []
+    stopped = 0
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(RSS_FEEDS))) as pool:
+        for (source_name, feed_url), parsed in pool.map(_one, RSS_FEEDS):
+            if parsed is None:
+                continue
+            items, keys, early = parsed
+            results.extend(items)
+            stopped += early
+            if feed_url in RANKED_FEEDS:
+                continue
+            # newest keys first, topped up with the older markers still worth keeping
+            old = [k for k in state.get(feed_url, []) if k not in keys]
+            state[feed_url] = (keys + old)[:_SEEN_KEYS]
 
     # Deduplicate by URL
     seen: set = set()
@@ -121,6 +185,6 @@ def collect_rss(max_per_feed: int = 20) -> list:
             seen.add(key)
             unique.append(item)
 
-    backend = "feedparser" if _HAVE_FEEDPARSER else "xml fallback"
-    print(f"  RSS [{backend}]: {len(unique)} unique articles from {len(RSS_FEEDS)} feeds")
-    return unique
+    print(f"  RSS [streaming]: {len(unique)} new articles from {len(RSS_FEEDS)} feeds "
+          f"({stopped} stopped at previously seen entries)")
+    return (unique, state) if incremental else unique
@@ -0,0 +1,33 @@
+"""
+Small per-database values: which ticker universe the tags were built for, how
+far a background job has got, which feed entries the collectors have already
+stored, and the like.
+
+These describe the contents of one database, so they live in its `app_state`
+table rather than under CACHE_DIR: that directory is disposable, and it is
+shared by whichever database TRENDFLOW_DB_URL points at.
+Writing a value inside the transaction that does the work it records means
+the two commit (or roll back) together.
+"""
+import json
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import AppState
+
+
+# Both take a Session or a Connection, so they join whatever transaction it has.
+def get_value(db, key: str, default=None):
+    """The stored value for `key`, or `default`."""
+    value = db.execute(select(AppState.value).where(AppState.key == key)).scalar()
+    return json.loads(value) if value is not None else default
+
+
+def set_value(db, key: str, value):
+    """Store `value` (anything JSON can hold) under `key`. Doesn't commit."""
+    name = (db.dialect if hasattr(db, 'dialect') else db.get_bind().dialect).name
+    stmt = (postgresql if name == 'postgresql' else sqlite).insert(AppState)
+    stmt = stmt.values(key=key, value=json.dumps(value))
+    db.execute(stmt.on_conflict_do_update(index_elements=['key'],
+                                          set_={'value': stmt.excluded.value}))
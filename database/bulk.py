@@ -0,0 +1,187 @@
+"""
+Bulk write path for the collectors.
+
+ORM `session.add()` per row costs a Python object, an identity-map entry and a
+separate INSERT for every story, keyword and price bar. These helpers hand a
+whole batch to one Core `executemany` instead, with `INSERT ... ON CONFLICT`
+doing the deduplication in the database:
+
+  * stories / articles  — keyed on the unique `url_hash` index, DO NOTHING;
+                          stories hand back the (id, title, url_hash) of
+                          the rows actually added
+  * story_tickers       — keyed on (story_id, ticker), DO NOTHING; each tag
+                          actually added counts its story into
+                          ticker_daily_social (see rollup.py)
+  * market_data         — keyed on `uix_ticker_date`, DO UPDATE (a re-fetched
+                          bar replaces the stored one, e.g. a finalised close)
+  * keyword_counts      — plain append; keyword and platform strings are first
+                          interned into keyword_vocab / platforms (DO NOTHING)
+                          and stored as their integer ids; the same batch is
+                          summed into keyword_hourly (see rollup.py)
+  * engagement refresh  — executemany UPDATE of score/num_comments by url_hash
+  * sentiment re-score  — executemany UPDATE of sentiment/sentiment_version by id
+                          (both move the stories' mentions in ticker_daily_social
+                          from the old values to the new ones)
+
+Nothing here commits: the caller owns the transaction, so one source's batch
+lands (or rolls back) as a unit.
+"""
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import Story, Article, KeywordCount, KeywordTerm, MarketData, Platform, StoryTicker
+from . import rollup
+
+_MARKET_FIELDS = ('open', 'close', 'high', 'low', 'volume', 'return_pct')
+
+
+def _insert(session, model):
+    """Dialect-specific INSERT so ON CONFLICT is available (SQLite or Postgres)."""
+    if session.get_bind().dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def _execute(session, stmt, rows) -> int:
+    """Run `stmt` as one executemany on the session's connection (and transaction)."""
+    # Going through the Connection keeps this a plain Core executemany instead
+    # of the ORM bulk path, and gives back the driver's rowcount for the batch.
+    result = session.connection().execute(stmt, rows)
+    return result.rowcount if result.rowcount >= 0 else len(rows)
+
+
+def insert_stories(session, rows: list) -> list:
+    """
+    Insert Story dicts, skipping any whose url_hash is already stored.
+    Returns (id, title, url_hash) for each row actually inserted.
+    """
+    if not rows:
+        return []
+    stmt = _insert(session, Story).on_conflict_do_nothing(index_elements=['url_hash'])
+    conn = session.connection()
+    if conn.dialect.insert_executemany_returning:
+        return [tuple(r) for r in conn.execute(
+            stmt.returning(Story.id, Story.title, Story.url_hash), rows)]
+    # no RETURNING with executemany (SQLite < 3.35): one INSERT per row, so each
+    # one's rowcount says whether it was skipped and its id comes back with it
+    added = []
+    for row in rows:
+        result = conn.execute(stmt, row)
+        if result.rowcount:
+            added.append((result.inserted_primary_key[0], row['title'], row.get('url_hash')))
+    return added
+
+
+def insert_articles(session, rows: list) -> int:
+    """Insert Article dicts, skipping any whose url_hash is already stored."""
+    if not rows:
+        return 0
+    stmt = _insert(session, Article).on_conflict_do_nothing(index_elements=['url_hash'])
+    return _execute(session, stmt, rows)
+
+
+def insert_story_tickers(session, rows: list) -> int:
+    """Insert {story_id, ticker} tags, skipping any already stored; returns how many were added."""
+    if not rows:
+        return 0
+    stmt = _insert(session, StoryTicker).on_conflict_do_nothing()
+    conn = session.connection()
+    if conn.dialect.insert_executemany_returning:
+        added = {tuple(r) for r in conn.execute(
+            stmt.returning(StoryTicker.story_id, StoryTicker.ticker), rows)}
+    else:
+        # no RETURNING with executemany: anything not stored beforehand was added
+        table = StoryTicker.__table__
+        story_ids = list({r['story_id'] for r in rows})
+        stored = set()
+        for i in range(0, len(story_ids), 500):
+            stored.update(tuple(r) for r in conn.execute(
+                select(table.c.story_id, table.c.ticker)
+                .where(table.c.story_id.in_(story_ids[i:i + 500]))))
+        conn.execute(stmt, rows)
+        added = {(r['story_id'], r['ticker']) for r in rows} - stored
+    rollup.apply_mentions(conn, added=rollup.mentions_of_tags(conn, added))
+    return len(added)
+
+
+def intern(session, model, column: str, values) -> dict:
+    """{value: id} from a vocabulary table's unique `column`, adding values not stored yet."""
+    values = list({v for v in values if v is not None})
+    if not values:
+        return {}
+    table = model.__table__
+    stmt = _insert(session, model).on_conflict_do_nothing(index_elements=[column])
+    conn = session.connection()
+    conn.execute(stmt, [{column: v} for v in values])
+    ids = {}
+    for i in range(0, len(values), 500):  # old SQLite caps bound parameters at 999
+        chunk = values[i:i + 500]
+        ids.update((v, row_id) for row_id, v in conn.execute(
+            select(table.c.id, table.c[column]).where(table.c[column].in_(chunk))))
+    return ids
+
+
+def insert_keywords(session, rows: list) -> int:
+    """Append {keyword, platform, count, timestamp} dicts as keyword_counts rows (and roll them up)."""
+    if not rows:
+        return 0
+    terms = intern(session, KeywordTerm, 'term', (r['keyword'] for r in rows))
+    platforms = intern(session, Platform, 'name', (r['platform'] for r in rows))
+    counts = [{'keyword_id': terms.get(r['keyword']), 'platform_id': platforms.get(r['platform']),
+               'count': r['count'], 'timestamp': r['timestamp']}
+              for r in rows]
+    inserted = _execute(session, _insert(session, KeywordCount), counts)
+    rollup.add_keyword_counts(session.connection(), [dict(c, platform=r['platform'])
+                                              for c, r in zip(counts, rows)])
+    return inserted
+
+
+def upsert_market_bars(session, bars: list) -> int:
+    """Insert price bars, replacing the OHLCV of any (ticker, date) already stored."""
+    if not bars:
+        return 0
+    rows = [{'ticker': b['ticker'], 'date': b['date'],
+             **{f: b[f] for f in _MARKET_FIELDS}} for b in bars]
+    stmt = _insert(session, MarketData)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['ticker', 'date'],
+        set_={f: stmt.excluded[f] for f in _MARKET_FIELDS},
+    )
+    return _execute(session, stmt, rows)
+
+
+def update_engagement(session, rows: list) -> int:
+    """Refresh score/num_comments of stored stories; rows are {url_hash, score, num_comments}."""
+    if not rows:
+        return 0
+    stmt = (update(Story.__table__)
+            .where(Story.__table__.c.url_hash == bindparam('h'))
+            .values(score=bindparam('score'), num_comments=bindparam('num_comments')))
+    conn = session.connection()
+    hashes = [r['url_hash'] for r in rows]
+    before = rollup.mentions(conn, Story.url_hash, hashes)
+    updated = _execute(session, stmt, [{'h': r['url_hash'], 'score': r['score'],
+                                        'num_comments': r['num_comments']} for r in rows])
+    if before:
+        rollup.apply_mentions(conn, removed=before,
+                              added=rollup.mentions(conn, Story.url_hash, hashes))
+    return updated
+
+
+def update_sentiment(session, rows: list) -> int:
+    """Overwrite stored scores; rows are {id, sentiment, sentiment_version}."""
+    if not rows:
+        return 0
+    table = Story.__table__
+    stmt = (update(table)
+            .where(table.c.id == bindparam('story_id'))
+            .values(sentiment=bindparam('sentiment'),
+                    sentiment_version=bindparam('sentiment_version')))
+    conn = session.connection()
+    ids = [r['id'] for r in rows]
+    before = rollup.mentions(conn, Story.id, ids)
+    updated = _execute(session, stmt, [{'story_id': r['id'], 'sentiment': r['sentiment'],
+                                        'sentiment_version': r['sentiment_version']} for r in rows])
+    if before:
+        rollup.apply_mentions(conn, removed=before, added=rollup.mentions(conn, Story.id, ids))
+    return updated
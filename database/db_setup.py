@@ -1,19 +1,135 @@
-from sqlalchemy import create_engine
-from .models import Base
+"""
+Engines and sessions for the whole process.
+
+One engine per database (and per mode) is created on first use and shared, so
+every `getSession()` reuses the same connection pool instead of building a new
+engine. The database comes from TRENDFLOW_DB_URL (default: trendflow.db in the
+working directory). Importing this module no longer touches the database;
+writers call `db_connection()` once to create or upgrade the schema (see
+migrations.py).
+
+On SQLite every connection gets:
+  * journal_mode=WAL — readers see the last committed snapshot and never wait
+    for a writer's commit (nor the writer for them); set by writer connections
+  * synchronous=NORMAL — safe under WAL, without an fsync per commit
+  * mmap_size / cache_size — TRENDFLOW_SQLITE_MMAP_MB / TRENDFLOW_SQLITE_CACHE_MB
+  * auto_vacuum=INCREMENTAL — takes effect when a new database is created, so
+    database/retention.py can hand freed pages back in small chunks
+
+`getSession(readonly=True)` hands out sessions whose connections refuse
+writes (`query_only` on SQLite, read-only transactions on Postgres); the
+dashboard and the view scripts read through those. A reader never creates or
+migrates the database: the first read-only session fails with a clear error
+if the file is missing or its schema is older than the code.
+"""
+import os
+import threading
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
+from . import migrations
 from sqlalchemy.orm import sessionmaker
- 
-def db_connection(): #creates database file and all the tables defined in models
-    engine = create_engine('sqlite:///trendflow.db')
-    Base.metadata.create_all(engine)
 
-def getSession(): # creates connection to the db and return session object to let you use that db
-    engine = create_engine('sqlite:///trendflow.db')
-    Session = sessionmaker(bind=engine) # returns session class
-    return Session()
+DB_URL = os.getenv('TRENDFLOW_DB_URL', 'sqlite:///trendflow.db')
+SQLITE_MMAP_MB = int(os.getenv('TRENDFLOW_SQLITE_MMAP_MB', '256'))
+SQLITE_CACHE_MB = int(os.getenv('TRENDFLOW_SQLITE_CACHE_MB', '64'))
+
+_engines = {}
+_sessionmakers = {}
+_lock = threading.Lock()
+
+
+def _resolved_url():
+    url = make_url(DB_URL)
+    if (url.get_backend_name() == 'sqlite' and url.database
+            and url.database != ':memory:' and not url.database.startswith('file:')):
+        # a relative path means the working directory at connect time; pin it
+        # so a later chdir gets its own engine rather than another file
+        url = url.set(database=os.path.abspath(url.database))
+    return url
+
+
+def _sqlite_pragmas(readonly: bool):
+    def on_connect(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        if not readonly:
+            cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')  # only before the first table
+            cursor.execute('PRAGMA journal_mode=WAL')  # persistent, stored in the file
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}')
+        cursor.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}')  # negative = KiB
+        if readonly:
+            cursor.execute('PRAGMA query_only=ON')
+        cursor.close()
+    return on_connect
+
+
+def _check_schema(engine):
+    """Refuse to read a missing database or one the migrations haven't caught up with."""
+    if not database_exists():
+        raise RuntimeError(f"No database at {engine.url.database}; "
+                           f"run `python -m database.migrations` to create it")
+    with engine.connect() as conn:
+        version = (migrations.current_version(conn)
+                   if inspect(conn).has_table('schema_version') else 0)
+    if version < migrations.LATEST:
+        engine.dispose()
+        raise RuntimeError(f"Database schema is v{version}, this code needs v{migrations.LATEST}; "
+                           f"run `python -m database.migrations` to upgrade it")
+
+
+def _shared(readonly: bool):
+    """(engine, sessionmaker) for the current database and mode, made on first use."""
+    url = _resolved_url()
+    key = (url.render_as_string(hide_password=False), readonly)
+    with _lock:
+        if key not in _engines:
+            engine = create_engine(url)
+            if url.get_backend_name() == 'sqlite':
+                event.listen(engine, 'connect', _sqlite_pragmas(readonly))
+            elif readonly and url.get_backend_name() == 'postgresql':
+                engine = engine.execution_options(postgresql_readonly=True)
+            if readonly:
+                _check_schema(engine)
+            _engines[key] = engine
+            _sessionmakers[key] = sessionmaker(bind=engine)
+        return _engines[key], _sessionmakers[key]
+
+
+def get_engine(readonly: bool = False):
+    """The process-wide engine for TRENDFLOW_DB_URL (a separate one for readers)."""
+    return _shared(readonly)[0]
+
+
+def database_exists() -> bool:
+    """False only for a SQLite file that hasn't been created yet."""
+    url = _resolved_url()
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        return True
+    return os.path.exists(url.database.split('?')[0].removeprefix('file:'))
 
-# Create tables when module is imported
-db_connection()
 
+def db_connection(): #creates the database and its tables, migrating an older one, and brings the ticker tags up to date; returns the schema version
+    version = migrations.upgrade(get_engine())
+    if version <= migrations.LATEST:
+        # an upgraded database gets its story_tickers (and so ticker_daily_social)
+        # here, before any reader; a no-op unless tickers.json changed since tagging
+        from analysis.ticker_tags import ensure_current   # analysis imports this module
+        session = getSession()
+        try:
+            ensure_current(session)
+        finally:
+            session.close()
+    return version
 
+def getSession(readonly: bool = False): # returns a session on the shared engine
+    return _shared(readonly)[1]()
 
 
+def dispose_engines():
+    """Close every pooled connection and forget the engines (tests, benchmarks)."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _sessionmakers.clear()
@@ -0,0 +1,171 @@
+"""
+URL deduplication without loading history.
+
+Every stored story and article carries `url_hash` — the SHA-1 of its URL — under
+a unique index. Deciding whether a batch of freshly collected URLs is new is an
+indexed `IN (...)` lookup over just that batch, so the cost of a check depends
+on the batch size, not on how many URLs have ever been collected.
+
+An optional Bloom filter (TRENDFLOW_URL_BLOOM=1) sits in front of the index:
+URLs it has definitely never seen skip the database entirely. It is persisted
+under the cache directory and topped up incrementally from the rows added since
+it was last saved, so only the very first build reads the whole table.
+"""
+import hashlib
+import math
+import os
+import struct
+
+from config import CACHE_DIR
+from .models import Story, Article
+
+USE_BLOOM = os.getenv('TRENDFLOW_URL_BLOOM', '0') == '1'
+BLOOM_PATH = os.path.join(CACHE_DIR, 'url_bloom.bin')
+BLOOM_ERROR_RATE = 0.01
+_QUERY_CHUNK = 500        # stay well under SQLite's bound-parameter limit
+_HEADER = struct.Struct('<QQIII')  # story watermark, article watermark, m, k, n
+
+
+def url_hash(url: str):
+    """Stable hash used as the dedup key; None for a missing URL (never deduped)."""
+    url = (url or '').strip()
+    if not url:
+        return None
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+# ── Bloom filter ──────────────────────────────────────────────────────────────
+class UrlBloom:
+    """A fixed-size Bloom filter over url_hash strings."""
+
+    def __init__(self, capacity: int, m: int = None, k: int = None, bits: bytearray = None):
+        self.capacity = max(capacity, 1024)
+        self.m = m or int(-self.capacity * math.log(BLOOM_ERROR_RATE) / (math.log(2) ** 2))
+        self.k = k or max(1, round(self.m / self.capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.m + 7) // 8)
+        self.count = 0
+        self.watermarks = (0, 0)   # highest (story id, article id) already added
+
+    def _positions(self, h: str):
+        # double hashing from two independent 64-bit halves of the SHA-1
+        h1, h2 = int(h[:16], 16), int(h[16:32], 16) | 1
+        return ((h1 + i * h2) % self.m for i in range(self.k))
+
+    def add(self, h: str, count: bool = True):
+        """Set `h`'s bits; `count=False` when a later top-up will count its row."""
+        for pos in self._positions(h):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        if count:
+            self.count += 1
+
+    def __contains__(self, h: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(h))
+
+    @property
+    def saturated(self) -> bool:
+        return self.count > self.capacity
+
+    def save(self, path: str = BLOOM_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as fh:
+            fh.write(_HEADER.pack(*self.watermarks, self.m, self.k, self.count))
+            fh.write(self.bits)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = BLOOM_PATH):
+        try:
+            with open(path, 'rb') as fh:
+                story_wm, article_wm, m, k, n = _HEADER.unpack(fh.read(_HEADER.size))
+                bits = bytearray(fh.read())
+        except (OSError, struct.error):
+            return None
+        if len(bits) != (m + 7) // 8:
+            return None
+        # recover the capacity the filter was sized for from m
+        capacity = int(m * (math.log(2) ** 2) / -math.log(BLOOM_ERROR_RATE))
+        bloom = cls(capacity, m=m, k=k, bits=bits)
+        bloom.count = n
+        bloom.watermarks = (story_wm, article_wm)
+        return bloom
+
+
+def _top_up(session, bloom: UrlBloom):
+    """Add every stored hash above the bloom's watermarks."""
+    story_wm, article_wm = bloom.watermarks
+    for model, wm in ((Story, story_wm), (Article, article_wm)):
+        q = (session.query(model.id, model.url_hash)
+             .filter(model.id > wm, model.url_hash.isnot(None))
+             .order_by(model.id)
+             .yield_per(10000))
+        for row_id, h in q:
+            bloom.add(h)
+            wm = row_id
+        if model is Story:
+            story_wm = wm
+        else:
+            article_wm = wm
+    bloom.watermarks = (story_wm, article_wm)
+
+
+def load_bloom(session) -> UrlBloom:
+    """Load the persisted filter, top it up, and rebuild it larger once it fills."""
+    bloom = UrlBloom.load()
+    if bloom is not None:
+        _top_up(session, bloom)
+    if bloom is None or bloom.saturated:
+        stored = (session.query(Story.id).count() + session.query(Article.id).count())
+        bloom = UrlBloom(capacity=max(2 * stored, 100_000))
+        _top_up(session, bloom)
+    bloom.save()
+    return bloom
+
+
+# ── Index ─────────────────────────────────────────────────────────────────────
+class UrlIndex:
+    """
+    New-versus-seen checks for one pipeline run.
+
+    `filter_new` consults the (optional) Bloom filter, then the url_hash unique
+    indexes on stories and articles, for just the hashes in the batch. Hashes
+    handed to `add` are remembered for the rest of the run.
+    """
+
+    def __init__(self, session, use_bloom: bool = None):
+        self.session = session
+        use_bloom = USE_BLOOM if use_bloom is None else use_bloom
+        self.bloom = load_bloom(session) if use_bloom else None
+        self._added = set()
+
+    def _stored(self, hashes: list) -> set:
+        found = set()
+        for i in range(0, len(hashes), _QUERY_CHUNK):
+            chunk = hashes[i:i + _QUERY_CHUNK]
+            for model in (Story, Article):
+                found.update(h for (h,) in self.session.query(model.url_hash)
+                             .filter(model.url_hash.in_(chunk)))
+        return found
+
+    def filter_new(self, hashes) -> set:
+        """Return the subset of `hashes` not stored yet (None entries are ignored)."""
+        batch = {h for h in hashes if h} - self._added
+        if self.bloom is not None:
+            maybe = [h for h in batch if h in self.bloom]
+        else:
+            maybe = list(batch)
+        return batch - self._stored(maybe) if maybe else batch
+
+    def add(self, h: str):
+        if not h:
+            return
+        self._added.add(h)
+        if self.bloom is not None:
+            # counted once, when close() tops up from the row's id
+            self.bloom.add(h, count=False)
+
+    def close(self):
+        """Persist the Bloom filter (the rows it covers are now committed)."""
+        if self.bloom is not None:
+            _top_up(self.session, self.bloom)
+            self.bloom.save()
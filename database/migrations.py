@@ -0,0 +1,254 @@
+"""
+Versioned schema migrations.
+
+The schema version lives in the one-row `schema_version` table. `upgrade()`
+(run by `db_setup.db_connection`) creates any missing tables from the models,
+then applies every migration newer than the stored version, in order, each in
+its own transaction together with the version bump, so an interrupted upgrade
+resumes at the step that didn't land. An existing trendflow.db is upgraded in
+place; one from before versioning starts at version 0. Each step checks the
+live schema before it changes anything, so databases that older releases
+already partly upgraded, and new ones create_all() just built, pass through.
+
+`python -m database.migrations` upgrades the configured database and prints
+its version. Add `--explain` to run the feature queries and list any that
+still full-scan a large table (see `full_scans`).
+"""
+import argparse
+import re
+
+from sqlalchemy import event, inspect, text
+
+from .dedup import url_hash
+from .models import Base
+from .rollup import rebuild_keyword_hourly, rebuild_ticker_daily_social
+
+
+# ── Steps ─────────────────────────────────────────────────────────────────────
+def _columns(conn, table) -> set:
+    return {c['name'] for c in inspect(conn).get_columns(table)}
+
+
+def _add_column(conn, table, column, ddl):
+    if column not in _columns(conn, table):
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+
+def _create_tables(conn, *names):
+    """Create the named tables, as declared on the models, unless they exist."""
+    for name in names:
+        Base.metadata.tables[name].create(conn, checkfirst=True)
+
+
+def _create_indexes(conn, *names):
+    """Create the named indexes, as declared on the models, unless they exist."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in names:
+                index.create(conn, checkfirst=True)
+
+
+def _backfill_url_hash(conn, table):
+    """Hash the rows that have none yet; repeated URLs keep the hash on their first row only."""
+    seen = {h for (h,) in conn.execute(text(f'SELECT url_hash FROM {table} '
+                                            f'WHERE url_hash IS NOT NULL'))}
+    updates = []
+    for row_id, url in conn.execute(text(f"SELECT id, url FROM {table} WHERE url_hash IS NULL "
+                                         f"AND url IS NOT NULL AND url != '' ORDER BY id")):
+        h = url_hash(url)
+        if h is None or h in seen:
+            continue
+        seen.add(h)
+        updates.append({'id': row_id, 'h': h})
+    if updates:
+        conn.execute(text(f'UPDATE {table} SET url_hash = :h WHERE id = :id'), updates)
+
+
+def _url_hashes(conn):
+    for table in ('stories', 'articles'):
+        _add_column(conn, table, 'url_hash', 'VARCHAR(40)')
+        _backfill_url_hash(conn, table)
+    _create_indexes(conn, 'uix_stories_url_hash', 'uix_articles_url_hash')
+
+
+def _sentiment_version(conn):
+    _add_column(conn, 'stories', 'sentiment_version', 'VARCHAR(12)')  # NULL = scored before versioning
+
+
+def _story_tickers_index(conn):
+    _create_indexes(conn, 'ix_story_tickers_ticker')
+
+
+def _near_dup(conn):
+    _add_column(conn, 'stories', 'near_dup', 'BOOLEAN')  # NULL = ingested before detection
+
+
+_KEYWORDS_VIEW = (
+    "CREATE VIEW keywords AS "
+    "SELECT c.id AS id, v.term AS keyword, p.name AS platform, "
+    "c.count AS count, c.timestamp AS timestamp "
+    "FROM keyword_counts c "
+    "LEFT JOIN keyword_vocab v ON v.id = c.keyword_id "
+    "LEFT JOIN platforms p ON p.id = c.platform_id"
+)
+
+
+def _keyword_vocabulary(conn):
+    """Move the old string-per-row keywords table into the vocabulary + keyword_counts."""
+    insp = inspect(conn)
+    if 'keywords' in insp.get_table_names():
+        conn.execute(text("INSERT INTO keyword_vocab (term) SELECT DISTINCT keyword FROM keywords "
+                          "WHERE keyword IS NOT NULL"))
+        conn.execute(text("INSERT INTO platforms (name) SELECT DISTINCT platform FROM keywords "
+                          "WHERE platform IS NOT NULL"))
+        conn.execute(text("INSERT INTO keyword_counts (id, keyword_id, platform_id, count, timestamp) "
+                          "SELECT k.id, v.id, p.id, k.count, k.timestamp FROM keywords k "
+                          "LEFT JOIN keyword_vocab v ON v.term = k.keyword "
+                          "LEFT JOIN platforms p ON p.name = k.platform"))
+        conn.execute(text("DROP TABLE keywords"))
+    if 'keywords' not in insp.get_view_names():
+        conn.execute(text(_KEYWORDS_VIEW))
+
+
+def _hot_path_indexes(conn):
+    # the time-window reads behind every feature build (see models.py)
+    _create_indexes(conn, 'ix_stories_timestamp', 'ix_keyword_counts_timestamp',
+                    'ix_market_data_date')
+
+
+# Steps 7 and 8 deliberately call the current rollup rebuilds instead of a
+# frozen copy. Each runs right after create_all() made its table, which is then
+# empty, so whatever today's rebuild computes from the raw rows is exactly the
+# rollup the insert-time code would have kept; a rebuild that changes how it
+# aggregates must stay correct on an empty table and current raw rows.
+def _keyword_hourly(conn):
+    # create_all() made the table; fill it from the history already stored
+    rebuild_keyword_hourly(conn)
+
+
+def _app_state(conn):
+    _create_tables(conn, 'app_state')
+
+
+def _ticker_daily_social(conn):
+    rebuild_ticker_daily_social(conn)
+
+
+# (version, what it does, step). Append only; never renumber or edit a step
+# that has shipped.
+MIGRATIONS = [
+    (1, 'url_hash dedup keys on stories and articles', _url_hashes),
+    (2, 'stories.sentiment_version', _sentiment_version),
+    (3, 'story_tickers ticker index', _story_tickers_index),
+    (4, 'stories.near_dup', _near_dup),
+    (5, 'keyword vocabulary; keywords becomes a view', _keyword_vocabulary),
+    (6, 'time-window indexes on stories, keyword_counts, market_data', _hot_path_indexes),
+    (7, 'hourly keyword rollup (keyword_hourly)', _keyword_hourly),
+    (8, 'per-ticker daily sentiment sums (ticker_daily_social)', _ticker_daily_social),
+    (9, 'app_state key/value table (per-database checkpoints)', _app_state),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+# ── Runner ────────────────────────────────────────────────────────────────────
+def _sqlite_begin(conn):
+    conn.exec_driver_sql('BEGIN')
+
+
+def current_version(conn) -> int:
+    row = conn.execute(text('SELECT version FROM schema_version')).first()
+    return row[0] if row else 0
+
+
+def upgrade(engine) -> int:
+    """Create missing tables, apply pending migrations; returns the schema version."""
+    fresh = 'stories' not in inspect(engine).get_table_names()
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)'))
+        version = current_version(conn)
+        if not conn.execute(text('SELECT 1 FROM schema_version')).first():
+            conn.execute(text('INSERT INTO schema_version (version) VALUES (0)'))
+    if version > LATEST:
+        print(f"Database schema v{version} is newer than this code (v{LATEST}); not migrating")
+        return version
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.connect() as conn:
+            if conn.dialect.name == 'sqlite':
+                # pysqlite only opens a transaction in front of DML, so a step's
+                # ALTER TABLE would commit on its own; BEGIN explicitly (the
+                # SQLAlchemy pysqlite recipe) so the whole step rolls back
+                event.listen(conn, 'begin', _sqlite_begin)
+            with conn.begin():
+                step(conn)
+                conn.execute(text('UPDATE schema_version SET version = :v'), {'v': number})
+        if not fresh:   # a brand-new database needn't announce each step
+            print(f"  schema v{number}: {description}")
+        version = number
+    return version
+
+
+# ── Query plans ───────────────────────────────────────────────────────────────
+HOT_TABLES = ('stories', 'keyword_counts', 'keyword_hourly', 'market_data', 'articles')
+_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+
+def full_scans(session, run) -> list:
+    """
+    Call `run()`, then EXPLAIN QUERY PLAN every SELECT it sent (SQLite only).
+    Returns (sql, plan detail) for each full scan of a HOT_TABLES table.
+    """
+    engine = session.get_bind()
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        run()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+
+    scans = []
+    conn = session.connection()
+    for statement, parameters in statements:
+        for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters):
+            m = _SCAN.match(row[-1])
+            if m and m.group(1) in HOT_TABLES:
+                scans.append((statement, row[-1]))
+    return scans
+
+
+def feature_queries(session):
+    """Run the analysis paths whose reads must stay index-driven."""
+    from analysis.feature_engineer import build_feature_matrix
+    from analysis.market_features import build_market_dataset
+    from analysis.trend_detector import detect_trending_keywords
+    from database.near_dup import load_index
+
+    build_market_dataset(session)
+    build_feature_matrix(session)
+    detect_trending_keywords(session)
+    load_index(session)
+
+
+if __name__ == "__main__":
+    from database.db_setup import db_connection, getSession
+
+    parser = argparse.ArgumentParser(description="Upgrade the database schema in place.")
+    parser.add_argument('--explain', action='store_true',
+                        help='also check that the feature queries use indexes')
+    args = parser.parse_args()
+
+    print(f"Schema version {db_connection()} (latest {LATEST})")
+    if args.explain:
+        session = getSession(readonly=True)
+        scans = full_scans(session, lambda: feature_queries(session))
+        for statement, detail in scans:
+            print(f"\n{detail}\n  in: {' '.join(statement.split())[:200]}")
+        print("No full scans of " + ", ".join(HOT_TABLES) if not scans
+              else f"\n{len(scans)} full scan(s)")
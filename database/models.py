@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, UniqueConstraint
+from sqlalchemy import Boolean, Column, Integer, String, Float, Date, DateTime, Text, UniqueConstraint, Index, ForeignKey
 from datetime import datetime
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -14,10 +14,94 @@ class Story(Base):
     num_comments = Column(Integer)
     timestamp = Column(DateTime,  default=datetime.utcnow)
     url = Column(Text)
+    url_hash = Column(String(40))  # sha1(url) — dedup key, see database/dedup.py
     platform = Column(String(50))
     sentiment = Column(Float, default=0.0)  # VADER compound score, [-1, 1]
+    sentiment_version = Column(String(12))  # analysis.sentiment.SENTIMENT_VERSION that scored it
+    near_dup = Column(Boolean)  # near-duplicate of an earlier headline, see database/near_dup.py
+    __table_args__ = (
+        Index('uix_stories_url_hash', 'url_hash', unique=True),
+        # time-window reads; covers the per-day social aggregation
+        Index('ix_stories_timestamp', 'timestamp', 'near_dup', 'sentiment', 'score'),
+    )
 
-class Keyword(Base):
+# Which tickers each story mentions, tagged once at ingest (analysis/ticker_tags.py)
+# so readers join on an index instead of re-matching every title.
+class StoryTicker(Base):
+    __tablename__ = 'story_tickers'
+
+    story_id = Column(Integer, ForeignKey('stories.id', ondelete='CASCADE'), primary_key=True)
+    ticker = Column(String(20), primary_key=True)
+    __table_args__ = (Index('ix_story_tickers_ticker', 'ticker', 'story_id'),)
+
+class TickerDailySocial(Base):
+    """
+    Additive sentiment statistics of each ticker's (non-near-duplicate) mentions
+    per UTC day; kept up to date by database/rollup.py. Means, spread, ratios and
+    the engagement-weighted sentiment are derived from these sums.
+    """
+    __tablename__ = 'ticker_daily_social'
+
+    id = Column(Integer, primary_key=True)
+    ticker = Column(String(20), nullable=False)
+    day = Column(Date, nullable=False)
+    mentions = Column(Integer, nullable=False, default=0)
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    sentiment_sq_sum = Column(Float, nullable=False, default=0.0)
+    bull_count = Column(Integer, nullable=False, default=0)
+    bear_count = Column(Integer, nullable=False, default=0)
+    weighted_sentiment_sum = Column(Float, nullable=False, default=0.0)  # Σ (score + 1) · sentiment
+    weight_sum = Column(Float, nullable=False, default=0.0)              # Σ (score + 1)
+    score_sum = Column(Integer, nullable=False, default=0)
+    __table_args__ = (UniqueConstraint('ticker', 'day', name='uix_ticker_daily_social'),)
+
+# Keyword strings and platform names are stored once each; the per-run counts
+# in keyword_counts refer to them by integer id.
+class KeywordTerm(Base):
+    __tablename__ = 'keyword_vocab'
+
+    id = Column(Integer, primary_key=True)
+    term = Column(String(200), nullable=False, unique=True)
+
+class Platform(Base):
+    __tablename__ = 'platforms'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), nullable=False, unique=True)
+
+class KeywordCount(Base):
+    """How often one keyword was extracted from one platform's stories in a run."""
+    __tablename__ = 'keyword_counts'
+
+    id = Column(Integer, primary_key=True)
+    keyword_id = Column(Integer, ForeignKey('keyword_vocab.id'))
+    platform_id = Column(Integer, ForeignKey('platforms.id'))
+    count = Column(Integer)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    # time-window reads (feature_engineer, trend_detector) never touch the table
+    __table_args__ = (Index('ix_keyword_counts_timestamp', 'timestamp', 'keyword_id', 'platform_id', 'count'),)
+
+class KeywordHourly(Base):
+    """keyword_counts summed per (keyword, platform, hour); kept up to date by database/rollup.py."""
+    __tablename__ = 'keyword_hourly'
+
+    id = Column(Integer, primary_key=True)
+    keyword_id = Column(Integer, ForeignKey('keyword_vocab.id'), nullable=False)
+    platform_id = Column(Integer, ForeignKey('platforms.id'))
+    hour = Column(DateTime, nullable=False)  # start of the hour (UTC)
+    count = Column(Integer, nullable=False, default=0)
+    weighted_count = Column(Float, nullable=False, default=0.0)  # count × platform weight
+    __table_args__ = (
+        UniqueConstraint('keyword_id', 'platform_id', 'hour', name='uix_keyword_hourly'),
+        Index('ix_keyword_hourly_hour', 'hour', 'keyword_id', 'platform_id', 'count', 'weighted_count'),
+    )
+
+# Read-only compatibility view (created by migrations.py) joining keyword_counts back
+# to strings, so readers such as view_keywords.py keep working. It lives outside
+# Base.metadata so create_all() never makes it a table. Write to KeywordCount.
+_ViewBase = declarative_base()
+
+class Keyword(_ViewBase):
     __tablename__ = 'keywords'
 
     id = Column(Integer, primary_key= True)
@@ -32,10 +116,12 @@ class Article(Base):
     id = Column(Integer, primary_key=True)
     title = Column(String(500))
     url = Column(Text)
+    url_hash = Column(String(40))  # sha1(url) — dedup key, see database/dedup.py
     source = Column(String(200))
     published_at = Column(DateTime)
     platform = Column(String(50))  # 'news' or 'rss'
     timestamp = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (Index('uix_articles_url_hash', 'url_hash', unique=True),)
 
 
 class MarketData(Base):
@@ -51,7 +137,10 @@ class MarketData(Base):
     low = Column(Float)
     volume = Column(Float)
     return_pct = Column(Float)   # daily % return vs previous close
-    __table_args__ = (UniqueConstraint('ticker', 'date', name='uix_ticker_date'),)
+    __table_args__ = (
+        UniqueConstraint('ticker', 'date', name='uix_ticker_date'),
+        Index('ix_market_data_date', 'date'),  # all tickers over a date range
+    )
 
 
 class PipelineRun(Base):
@@ -65,4 +154,15 @@ class PipelineRun(Base):
     stories_collected = Column(Integer, default=0)
     keywords_extracted = Column(Integer, default=0)
     sources_run = Column(String(500), nullable=True)   # comma-separated
-    error_message = Column(Text, nullable=True)
\ No newline at end of file
+    error_message = Column(Text, nullable=True)
+
+class AppState(Base):
+    """
+    Per-database settings, job checkpoints and crawl state, as JSON values (see
+    database/app_state.py). Kept in the database, not the disposable cache, so
+    they follow the data.
+    """
+    __tablename__ = 'app_state'
+
+    key = Column(String(100), primary_key=True)
+    value = Column(Text)
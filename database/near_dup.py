@@ -0,0 +1,159 @@
+"""
+Near-duplicate headline detection.
+
+URL dedup (dedup.py) can't see syndication: the same wire story arrives from
+RSS, Reddit and yfinance under different URLs, often lightly edited ("… -
+Reuters", a changed verb). Each copy used to go through NLP and count again
+towards a ticker's `buzz`.
+
+Titles are normalized to a set of content words (lower-cased, trailing
+" - Source" / " | Source" and stopwords dropped, a plural "s" trimmed). Two
+headlines are near-duplicates when those sets overlap by at least THRESHOLD
+(Jaccard). Each set gets a 64-value MinHash signature, cut into BANDS bands:
+pairs above the threshold almost always agree on a whole band, unrelated
+headlines almost never do. The index keeps one dict per band, so a lookup
+probes BANDS dicts and checks the exact overlap of the few titles found
+there — well under a millisecond however many stories the window holds.
+
+The window slides: only stories from the last WINDOW_HOURS are indexed (the
+index is rebuilt from the stories table at the start of a run), so a headline
+that recurs days later counts as news again.
+
+TRENDFLOW_NEAR_DUP decides what ingest does with a near-duplicate:
+  flag      store it with `near_dup` set; it gets no keywords and no buzz (default)
+  collapse  drop it: no NLP and no row
+  off       no detection
+"""
+import hashlib
+import os
+import re
+from collections import deque
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from analysis.stopwords import english_stopwords
+from .models import Story
+
+MODE = os.getenv('TRENDFLOW_NEAR_DUP', 'flag').lower()
+WINDOW_HOURS = float(os.getenv('TRENDFLOW_NEAR_DUP_WINDOW_HOURS', '48'))
+THRESHOLD = 0.7      # Jaccard overlap of content words that makes a near-duplicate
+MIN_WORDS = 4        # titles with fewer content words are too generic to compare
+BANDS, ROWS = 16, 4  # 64 MinHash values; P(candidate) is 0.99 at 0.7, 0.12 at 0.3
+
+_SOURCE_SUFFIX = re.compile(r'\s+[-|–—]\s+[^-|–—]{1,40}$')
+_WORD = re.compile(r'\w+')
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20240601)   # fixed: signatures must not change between runs
+_A = _rng.randint(1, _PRIME, BANDS * ROWS).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, BANDS * ROWS).astype(np.uint64)
+
+
+def normalize(title: str) -> frozenset:
+    """The content words of a title, without case, punctuation or a source suffix."""
+    title = _SOURCE_SUFFIX.sub('', (title or '').strip())
+    stop = english_stopwords()
+    return frozenset(w[:-1] if len(w) > 3 and w.endswith('s') and not w.endswith('ss') else w
+                     for w in _WORD.findall(title.lower()) if w not in stop)
+
+
+def _word_hash(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=4).digest(), 'big')
+
+
+def minhash(words) -> np.ndarray:
+    """BANDS * ROWS MinHash values of a word set (one universal hash per value)."""
+    hashes = np.fromiter((_word_hash(w) for w in words), dtype=np.uint64, count=len(words))
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class NearDupIndex:
+    """MinHash-banded content-word sets of the stories seen in the last `window_hours`."""
+
+    def __init__(self, window_hours: float = WINDOW_HOURS, threshold: float = THRESHOLD,
+                 collapse: bool = None):
+        self.window = timedelta(hours=window_hours)
+        self.threshold = threshold
+        self.collapse = (MODE == 'collapse') if collapse is None else collapse
+        self._buckets = [{} for _ in range(BANDS)]
+        self._entries = deque()   # (timestamp, words, band keys, title), oldest first
+        self._newest = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _keys(words) -> list:
+        signature = minhash(words)
+        return [signature[i * ROWS:(i + 1) * ROWS].tobytes() for i in range(BANDS)]
+
+    def find(self, words: frozenset, timestamp: datetime, keys: list = None):
+        """Title of an indexed story within the window and THRESHOLD, or None."""
+        keys = self._keys(words) if keys is None else keys
+        seen = set()
+        for bucket, key in zip(self._buckets, keys):
+            for entry in bucket.get(key, ()):
+                if id(entry) in seen:
+                    continue
+                seen.add(id(entry))
+                ts, other, _, title = entry
+                if (jaccard(words, other) >= self.threshold
+                        and abs(timestamp - ts) <= self.window):
+                    return title
+        return None
+
+    def add(self, words: frozenset, timestamp: datetime, title: str, keys: list = None):
+        keys = self._keys(words) if keys is None else keys
+        entry = (timestamp, words, keys, title)
+        self._entries.append(entry)
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(entry)
+        if self._newest is None or timestamp > self._newest:
+            self._newest = timestamp
+            self._expire(timestamp - self.window)
+
+    def _expire(self, cutoff: datetime):
+        # entries arrive roughly in time order; a straggler simply stays until
+        # the ones before it have gone (find() checks the window itself)
+        while self._entries and self._entries[0][0] < cutoff:
+            entry = self._entries.popleft()
+            for bucket, key in zip(self._buckets, entry[2]):
+                same = bucket[key]
+                same.remove(entry)
+                if not same:
+                    del bucket[key]
+
+    def check(self, title: str, timestamp: datetime):
+        """
+        The title this one near-duplicates, or None. A title that isn't a
+        near-duplicate is indexed, so later copies match it.
+        """
+        words = normalize(title)
+        if len(words) < MIN_WORDS:
+            return None
+        keys = self._keys(words)
+        original = self.find(words, timestamp, keys)
+        if original is None:
+            self.add(words, timestamp, title, keys)
+        return original
+
+
+def load_index(session, now: datetime = None):
+    """An index of the window's stored (non-duplicate) stories; None when MODE is off."""
+    if MODE == 'off':
+        return None
+    index = NearDupIndex()
+    now = now or datetime.utcnow()
+    q = (session.query(Story.title, Story.timestamp)
+         .filter(Story.timestamp >= now - index.window, Story.near_dup.isnot(True))
+         .order_by(Story.timestamp)
+         .yield_per(10000))
+    for title, timestamp in q:
+        words = normalize(title)
+        if len(words) >= MIN_WORDS:
+            index.add(words, timestamp, title)
+    return index
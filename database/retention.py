@@ -0,0 +1,269 @@
+"""
+Retention and compaction: keeps trendflow.db a bounded size under continuous
+collection.
+
+Every run appends keyword_counts rows and stories, and nothing used to delete
+anything. The rollups (rollup.py) already hold what the features read, so the
+raw rows can go once they age out of every reader's window:
+
+  * keyword_counts older than KEYWORD_RETENTION_DAYS are deleted; their counts
+    live on in keyword_hourly
+  * keyword_hourly rows older than HOURLY_RETENTION_DAYS are collapsed into one
+    row per (keyword, platform, day), stored at the day's midnight hour
+  * stories older than STORY_RETENTION_DAYS (and their ticker tags) are written
+    to gzipped JSON-lines files, one per month, under ARCHIVE_DIR, then deleted;
+    their sentiment stays in ticker_daily_social
+
+All cutoffs fall on midnight (UTC), so a rollup never holds a
+half-pruned hour or day. Each pass works in small batches, one short
+transaction each, and stops at its time budget; progress is idempotent, so
+the next pass just carries on. The keyword_hourly compaction records how far
+it got in app_state, in the same transaction as each step; a rollup rebuild
+moves that checkpoint back (`rewind_compaction`). An archived story's file is
+written and synced before the rows are deleted; if a pass dies in between, the
+next one archives those stories again (an archive may repeat a row, it never
+misses one).
+
+Deleted rows only free pages inside the file. With auto_vacuum=INCREMENTAL
+(new databases get it, see db_setup.py) `incremental_vacuum` hands those
+pages back to the filesystem VACUUM_PAGES at a time. An older database needs
+one full VACUUM to switch modes: `python -m database.retention --enable-vacuum`.
+
+A retention of 0 days keeps those rows forever. The scheduler runs a pass
+after each collection (TRENDFLOW_RETENTION_SECONDS); by hand it is
+`python -m database.retention`.
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+
+from .app_state import get_value, set_value
+from .models import KeywordCount, KeywordHourly, Story, StoryTicker
+from .rollup import collapse_to_days
+
+KEYWORD_RETENTION_DAYS = int(os.getenv('TRENDFLOW_KEYWORD_RETENTION_DAYS', '30'))
+HOURLY_RETENTION_DAYS = int(os.getenv('TRENDFLOW_HOURLY_RETENTION_DAYS', '90'))
+STORY_RETENTION_DAYS = int(os.getenv('TRENDFLOW_STORY_RETENTION_DAYS', '180'))
+ARCHIVE_DIR = os.getenv('TRENDFLOW_ARCHIVE_DIR', 'archive')
+
+BATCH_SIZE = 5000        # rows deleted / archived per transaction
+COMPACT_DAYS = 7         # keyword_hourly days collapsed per transaction
+VACUUM_PAGES = 2000      # pages freed per incremental_vacuum step (8 MB at 4 KiB pages)
+_STATE_KEY = 'retention.hourly_compacted_until'
+
+
+def _day_cutoff(days: int, now: datetime = None) -> datetime:
+    """Midnight `days` days ago; None when `days` is 0 (keep forever)."""
+    if days <= 0:
+        return None
+    start = (now or datetime.utcnow()) - timedelta(days=days)
+    return datetime(start.year, start.month, start.day)
+
+
+def _out_of_time(deadline) -> bool:
+    return deadline is not None and time.time() >= deadline
+
+
+# ── Raw keyword counts ────────────────────────────────────────────────────────
+def prune_keyword_counts(engine, cutoff: datetime, deadline=None) -> int:
+    """Delete keyword_counts rows from before `cutoff`; returns how many went."""
+    table = KeywordCount.__table__
+    doomed = (select(table.c.id).where(table.c.timestamp < cutoff)
+              .limit(BATCH_SIZE).scalar_subquery())
+    deleted = 0
+    while not _out_of_time(deadline):
+        with engine.begin() as conn:
+            n = conn.execute(delete(table).where(table.c.id.in_(doomed))).rowcount
+        deleted += n
+        if n < BATCH_SIZE:
+            break
+    return deleted
+
+
+# ── keyword_hourly → day grain ────────────────────────────────────────────────
+def compact_keyword_hourly(engine, cutoff: datetime, deadline=None) -> int:
+    """Collapse keyword_hourly rows from before `cutoff` to one per day; returns rows removed."""
+    table = KeywordHourly.__table__
+    with engine.connect() as conn:
+        done = get_value(conn, _STATE_KEY)
+        oldest = (None if done else
+                  conn.execute(select(table.c.hour).order_by(table.c.hour).limit(1)).scalar())
+    if done:
+        start = datetime.fromisoformat(done)
+    elif oldest is not None:
+        start = datetime(oldest.year, oldest.month, oldest.day)
+    else:
+        return 0
+
+    removed = 0
+    while start < cutoff and not _out_of_time(deadline):
+        end = min(start + timedelta(days=COMPACT_DAYS), cutoff)
+        with engine.begin() as conn:
+            removed += collapse_to_days(conn, start, end)
+            set_value(conn, _STATE_KEY, end.isoformat())
+        start = end
+    return removed
+
+
+def rewind_compaction(conn):
+    """
+    After keyword_hourly is rebuilt from the raw counts, move the checkpoint
+    back to the oldest raw count's day, from which the rows are hourly again.
+    Doesn't commit.
+    """
+    done = get_value(conn, _STATE_KEY)
+    oldest = conn.execute(select(func.min(KeywordCount.__table__.c.timestamp))).scalar()
+    if done and oldest is not None:
+        day = datetime(oldest.year, oldest.month, oldest.day)
+        if day < datetime.fromisoformat(done):
+            set_value(conn, _STATE_KEY, day.isoformat())
+
+
+# ── Story archive ─────────────────────────────────────────────────────────────
+_ARCHIVED_COLUMNS = ('id', 'title', 'score', 'num_comments', 'timestamp', 'url', 'url_hash',
+                     'platform', 'sentiment', 'sentiment_version', 'near_dup')
+
+
+def _archive_path(month: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f'stories-{month}.jsonl.gz')
+
+
+def _write_archive(records: list):
+    """Append story records to their month's file and sync it to disk."""
+    by_month = {}
+    for record in records:
+        by_month.setdefault(record['timestamp'][:7], []).append(record)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    for month, rows in by_month.items():
+        # each append is its own gzip member; readers (gzip.open) see one stream
+        with open(_archive_path(month), 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='ab') as fh:
+                for row in rows:
+                    fh.write((json.dumps(row, ensure_ascii=False) + '\n').encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+
+def archive_stories(engine, cutoff: datetime, deadline=None) -> int:
+    """Move stories from before `cutoff` into the archive files; returns how many moved."""
+    stories, tags = Story.__table__, StoryTicker.__table__
+    moved = 0
+    while not _out_of_time(deadline):
+        with engine.begin() as conn:
+            rows = conn.execute(select(*(stories.c[c] for c in _ARCHIVED_COLUMNS))
+                                .where(stories.c.timestamp < cutoff)
+                                .order_by(stories.c.timestamp)
+                                .limit(BATCH_SIZE)).mappings().all()
+            if not rows:
+                break
+            ids = [r['id'] for r in rows]
+            tickers = {}
+            for i in range(0, len(ids), 500):   # old SQLite caps bound parameters at 999
+                for story_id, ticker in conn.execute(
+                        select(tags.c.story_id, tags.c.ticker)
+                        .where(tags.c.story_id.in_(ids[i:i + 500]))):
+                    tickers.setdefault(story_id, []).append(ticker)
+            _write_archive([dict(r, timestamp=r['timestamp'].isoformat(),
+                                 tickers=sorted(tickers.get(r['id'], ())))
+                            for r in rows])
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                # tags first: SQLite doesn't enforce the ON DELETE CASCADE by default
+                conn.execute(delete(tags).where(tags.c.story_id.in_(chunk)))
+                conn.execute(delete(stories).where(stories.c.id.in_(chunk)))
+        moved += len(rows)
+        if len(rows) < BATCH_SIZE:
+            break
+    return moved
+
+
+def read_archive(month: str) -> list:
+    """The archived story records of a 'YYYY-MM' month."""
+    path = _archive_path(month)
+    if not os.path.exists(path):
+        return []
+    with gzip.open(path, 'rt', encoding='utf-8') as fh:
+        return [json.loads(line) for line in fh]
+
+
+# ── Free pages ────────────────────────────────────────────────────────────────
+def _pragma(conn, name: str):
+    return conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+
+
+def incremental_vacuum(engine, deadline=None) -> int:
+    """
+    Return free pages to the filesystem, VACUUM_PAGES at a time, and truncate
+    the WAL. SQLite with auto_vacuum=INCREMENTAL only; returns the pages freed.
+    """
+    if engine.dialect.name != 'sqlite':
+        return 0
+    freed = 0
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if _pragma(conn, 'auto_vacuum') != 2:
+            return 0
+        while not _out_of_time(deadline):
+            free = _pragma(conn, 'freelist_count')
+            if not free:
+                break
+            conn.exec_driver_sql(f'PRAGMA incremental_vacuum({VACUUM_PAGES})')
+            freed += free - _pragma(conn, 'freelist_count')
+        conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+    return freed
+
+
+def enable_incremental_vacuum(engine) -> bool:
+    """Switch an existing SQLite database to auto_vacuum=INCREMENTAL (one full VACUUM)."""
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if _pragma(conn, 'auto_vacuum') == 2:
+            return False
+        conn.exec_driver_sql('PRAGMA auto_vacuum=INCREMENTAL')   # recorded by the VACUUM
+        conn.exec_driver_sql('VACUUM')
+    return True
+
+
+# ── Pass ──────────────────────────────────────────────────────────────────────
+def run_retention(engine=None, max_seconds: float = None, now: datetime = None) -> dict:
+    """One retention pass within `max_seconds`; returns what each step did."""
+    if engine is None:
+        from .db_setup import get_engine
+        engine = get_engine()
+    deadline = time.time() + max_seconds if max_seconds is not None else None
+    done = {}
+
+    cutoff = _day_cutoff(KEYWORD_RETENTION_DAYS, now)
+    if cutoff is not None:
+        done['keyword_counts deleted'] = prune_keyword_counts(engine, cutoff, deadline)
+    cutoff = _day_cutoff(HOURLY_RETENTION_DAYS, now)
+    if cutoff is not None:
+        done['keyword_hourly rows compacted'] = compact_keyword_hourly(engine, cutoff, deadline)
+    cutoff = _day_cutoff(STORY_RETENTION_DAYS, now)
+    if cutoff is not None:
+        done['stories archived'] = archive_stories(engine, cutoff, deadline)
+    done['pages freed'] = incremental_vacuum(engine, deadline)
+    return done
+
+
+if __name__ == "__main__":
+    from database.db_setup import db_connection, get_engine
+
+    parser = argparse.ArgumentParser(description="Prune, compact and archive old rows.")
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='stop after this long (default: until done)')
+    parser.add_argument('--enable-vacuum', action='store_true',
+                        help='switch an existing database to incremental vacuum (one full VACUUM)')
+    args = parser.parse_args()
+
+    db_connection()
+    if args.enable_vacuum:
+        print("Switched to incremental vacuum" if enable_incremental_vacuum(get_engine())
+              else "Incremental vacuum already on (or not SQLite)")
+    for step, n in run_retention(max_seconds=args.max_seconds).items():
+        print(f"  {step}: {n}")
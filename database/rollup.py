@@ -0,0 +1,227 @@
+"""
+Rollups maintained at insert time, so feature builds read pre-aggregated rows.
+
+keyword_hourly — `feature_engineer.build_feature_matrix` needs per-keyword
+hourly totals: the count, how many platforms contributed, and a
+platform-weighted count. It used to pull every raw keyword_counts row of the
+window (up to 14 days for model training) and group them in pandas on each
+call. keyword_hourly keeps those sums, one row per (keyword, platform, hour).
+`add_keyword_counts` is called by `bulk.insert_keywords` for the same batch,
+summed in Python first and upserted with `count = count + excluded.count`.
+Rows with no platform never conflict (NULL ≠ NULL in a unique index), so such
+a keyword-hour may be split over several rows; readers sum, so this only
+costs a row.
+
+ticker_daily_social — `market_features._daily_social` derives a ticker's
+daily buzz, mean/std sentiment, bull/bear counts and engagement-weighted
+sentiment. All of them follow from additive sums (count, Σs, Σs², bull, bear,
+Σ(score+1)·s, Σ(score+1)), so the table stores those per (ticker, day) and
+every write that changes a mention applies its difference:
+
+  * a new story↔ticker tag adds the story's mention (`bulk.insert_story_tickers`)
+  * an engagement refresh or a sentiment re-score subtracts the stored
+    mention and adds the updated one (`bulk.update_engagement` /
+    `bulk.update_sentiment`), read before and after the UPDATE
+
+All of these run on the caller's connection, so a rollup commits (or rolls
+back) with the rows it summarises. `python -m database.rollup --rebuild`
+recomputes both tables from the raw rows, e.g. after PLATFORM_WEIGHTS
+changes; migrations 7 and 8 ran it once for existing history. Raw rows past
+their retention (database/retention.py) are gone, so a rebuild only replaces
+the hours / days from the oldest raw row on and keeps the rollups before it
+(and moves retention's compaction checkpoint back to that day).
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import KeywordCount, KeywordHourly, Platform, Story, StoryTicker, TickerDailySocial
+
+# how much one mention on each platform counts towards cross_source_score
+PLATFORM_WEIGHTS = {
+    'hackernews': 1.5,
+    'reddit': 1.3,
+    'github': 1.4,
+    'devto': 1.1,
+    'news': 1.2,
+    'rss': 1.0,
+}
+BULLISH, BEARISH = 0.15, -0.15   # sentiment above / below which a mention is bull / bear
+_CHUNK = 500                     # old SQLite caps bound parameters at 999
+
+
+def _insert(conn, table):
+    return (postgresql if conn.dialect.name == 'postgresql' else sqlite).insert(table)
+
+
+def _add_onto(conn, table, keys: list, totals: dict) -> int:
+    """Upsert {key tuple: value list}, adding the values onto any stored row."""
+    if not totals:
+        return 0
+    values = [c.name for c in table.columns if c.name not in keys and not c.primary_key]
+    stmt = _insert(conn, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={v: table.c[v] + stmt.excluded[v] for v in values},
+    )
+    conn.execute(stmt, [dict(zip(keys + values, (*key, *vals))) for key, vals in totals.items()])
+    return len(totals)
+
+
+# ── keyword_hourly ────────────────────────────────────────────────────────────
+_HOURLY_KEYS = ['keyword_id', 'platform_id', 'hour']
+
+
+def hour_of(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _accumulate(totals: dict, keyword_id, platform_id, platform: str, count, timestamp):
+    if keyword_id is None or timestamp is None:
+        return   # nothing downstream can group these
+    count = count or 0
+    entry = totals.setdefault((keyword_id, platform_id, hour_of(timestamp)), [0, 0.0])
+    entry[0] += count
+    entry[1] += count * PLATFORM_WEIGHTS.get(platform, 1.0)
+
+
+def add_keyword_counts(conn, rows: list) -> int:
+    """
+    Fold new keyword_counts rows ({keyword_id, platform_id, platform, count,
+    timestamp}, `platform` being the name) into keyword_hourly. Doesn't commit.
+    """
+    totals = {}
+    for r in rows:
+        _accumulate(totals, r['keyword_id'], r['platform_id'], r['platform'],
+                    r['count'], r['timestamp'])
+    return _add_onto(conn, KeywordHourly.__table__, _HOURLY_KEYS, totals)
+
+
+def rebuild_keyword_hourly(conn, batch: int = 50000) -> int:
+    """Recompute keyword_hourly from keyword_counts (the hours it still covers); returns the rows written."""
+    raw = KeywordCount.__table__
+    oldest = conn.execute(select(func.min(raw.c.timestamp))).scalar()
+    if oldest is None:
+        return 0
+    names = dict(conn.execute(select(Platform.__table__.c.id, Platform.__table__.c.name)).all())
+    hourly = KeywordHourly.__table__
+    conn.execute(delete(hourly).where(hourly.c.hour >= hour_of(oldest)))
+    result = conn.execution_options(yield_per=batch).execute(
+        select(raw.c.keyword_id, raw.c.platform_id, raw.c.count, raw.c.timestamp))
+    totals = {}
+    for keyword_id, platform_id, count, timestamp in result:
+        _accumulate(totals, keyword_id, platform_id, names.get(platform_id), count, timestamp)
+    return _add_onto(conn, KeywordHourly.__table__, _HOURLY_KEYS, totals)
+
+
+def collapse_to_days(conn, start: datetime, end: datetime) -> int:
+    """
+    Merge the keyword_hourly rows in [start, end) (whole days) into one row
+    per keyword, platform and day, kept at the day's midnight hour. Safe to
+    repeat. Returns how many rows it removed.
+    """
+    table = KeywordHourly.__table__
+    window = (table.c.hour >= start) & (table.c.hour < end)
+    totals = {}
+    for keyword_id, platform_id, hour, count, weighted in conn.execute(
+            select(table.c.keyword_id, table.c.platform_id, table.c.hour,
+                   table.c.count, table.c.weighted_count).where(window)):
+        entry = totals.setdefault((keyword_id, platform_id, hour.replace(hour=0)), [0, 0.0])
+        entry[0] += count
+        entry[1] += weighted
+    removed = conn.execute(delete(table).where(window)).rowcount
+    return removed - _add_onto(conn, table, _HOURLY_KEYS, totals)
+
+
+# ── ticker_daily_social ───────────────────────────────────────────────────────
+_SOCIAL_KEYS = ['ticker', 'day']
+# a mention: (story_id, ticker, timestamp, sentiment, score)
+_MENTION_COLUMNS = (Story.id, StoryTicker.ticker, Story.timestamp, Story.sentiment, Story.score)
+
+
+def _mention_query():
+    return (select(*_MENTION_COLUMNS)
+            .join(Story, Story.id == StoryTicker.story_id)
+            .where(Story.near_dup.isnot(True)))   # copies add no buzz (near_dup.py)
+
+
+def mentions(conn, column, values) -> list:
+    """The counted mentions of the stories whose `column` (Story.id, Story.url_hash) is in `values`."""
+    values = list(values)
+    found = []
+    for i in range(0, len(values), _CHUNK):
+        found.extend(tuple(r) for r in conn.execute(
+            _mention_query().where(column.in_(values[i:i + _CHUNK]))))
+    return found
+
+
+def mentions_of_tags(conn, pairs) -> list:
+    """The counted mentions behind (story_id, ticker) tags."""
+    pairs = list(pairs)
+    found = []
+    for i in range(0, len(pairs), _CHUNK // 2):
+        found.extend(tuple(r) for r in conn.execute(_mention_query().where(
+            tuple_(StoryTicker.story_id, StoryTicker.ticker).in_(pairs[i:i + _CHUNK // 2]))))
+    return found
+
+
+def _add_mention(totals: dict, mention, sign: int):
+    _, ticker, timestamp, sentiment, score = mention
+    if timestamp is None:
+        return
+    s = sentiment if sentiment is not None else 0.0
+    score = score or 0
+    w = score + 1
+    entry = totals.setdefault((ticker, timestamp.date()), [0, 0.0, 0.0, 0, 0, 0.0, 0.0, 0])
+    for i, v in enumerate((1, s, s * s, int(s > BULLISH), int(s < BEARISH), w * s, w, score)):
+        entry[i] += sign * v
+
+
+def apply_mentions(conn, removed=(), added=()) -> int:
+    """Subtract `removed` and add `added` mentions in ticker_daily_social. Doesn't commit."""
+    totals = {}
+    for m in removed:
+        _add_mention(totals, m, -1)
+    for m in added:
+        _add_mention(totals, m, 1)
+    # an unchanged story (same score, same sentiment) nets out to nothing to write
+    totals = {k: v for k, v in totals.items() if any(v)}
+    return _add_onto(conn, TickerDailySocial.__table__, _SOCIAL_KEYS, totals)
+
+
+def clear_ticker_daily_social(conn):
+    """Drop the sums of every day that still has stored stories (archived days stay)."""
+    oldest = conn.execute(select(func.min(Story.timestamp))).scalar()
+    if oldest is not None:
+        table = TickerDailySocial.__table__
+        conn.execute(delete(table).where(table.c.day >= oldest.date()))
+
+
+def rebuild_ticker_daily_social(conn, batch: int = 50000) -> int:
+    """Recompute ticker_daily_social from the stored stories and tags; returns the rows written."""
+    clear_ticker_daily_social(conn)
+    totals = {}
+    for m in conn.execution_options(yield_per=batch).execute(_mention_query()):
+        _add_mention(totals, tuple(m), 1)
+    return _add_onto(conn, TickerDailySocial.__table__, _SOCIAL_KEYS, totals)
+
+
+if __name__ == "__main__":
+    from database.db_setup import db_connection, get_engine
+    from database.retention import rewind_compaction
+
+    parser = argparse.ArgumentParser(description="Maintain the keyword_hourly and ticker_daily_social rollups.")
+    parser.add_argument('--rebuild', action='store_true',
+                        help='recompute both rollups from the raw rows')
+    args = parser.parse_args()
+
+    db_connection()
+    if args.rebuild:
+        with get_engine().begin() as conn:
+            print(f"keyword_hourly rebuilt: {rebuild_keyword_hourly(conn)} rows")
+            rewind_compaction(conn)   # the rebuilt days are hourly again
+            print(f"ticker_daily_social rebuilt: {rebuild_ticker_daily_social(conn)} rows")
+    else:
+        parser.print_help()
@@ -10,6 +10,11 @@ Usage:
     python scheduler.py                 # collect now, then every 24 hours
     TRENDFLOW_INTERVAL_HOURS=48 python scheduler.py   # every 48 hours instead
 
+After each collection, stories scored by an older sentiment version are
+re-scored in the background for up to TRENDFLOW_RESCORE_SECONDS (default 300),
+then old rows are pruned, compacted and archived for up to
+TRENDFLOW_RETENTION_SECONDS (default 120; see database/retention.py).
+
 Leave it running in a terminal, or detach it:
     nohup python scheduler.py > scheduler.log 2>&1 &
 """
@@ -21,8 +26,12 @@ from datetime import datetime
 import schedule
 
 from test_hn_api import run_pipeline
+from analysis.rescore_sentiment import rescore
+from database.retention import run_retention
 
 INTERVAL_HOURS = float(os.getenv("TRENDFLOW_INTERVAL_HOURS", "24"))
+RESCORE_SECONDS = float(os.getenv("TRENDFLOW_RESCORE_SECONDS", "300"))
+RETENTION_SECONDS = float(os.getenv("TRENDFLOW_RETENTION_SECONDS", "120"))
 
 
 def job():
@@ -35,6 +44,21 @@ def job():
         # never let one bad run kill the loop
         print(f"[{datetime.now():%H:%M:%S}] Collection failed:")
         traceback.print_exc()
+    try:
+        n = rescore(max_seconds=RESCORE_SECONDS)
+        if n:
+            print(f"[{datetime.now():%H:%M:%S}] Re-scored sentiment of {n} older stories.")
+    except Exception:
+        print(f"[{datetime.now():%H:%M:%S}] Sentiment re-scoring failed:")
+        traceback.print_exc()
+    try:
+        done = {step: n for step, n in run_retention(max_seconds=RETENTION_SECONDS).items() if n}
+        if done:
+            print(f"[{datetime.now():%H:%M:%S}] Retention: "
+                  + ", ".join(f"{n} {step}" for step, n in done.items()) + ".")
+    except Exception:
+        print(f"[{datetime.now():%H:%M:%S}] Retention pass failed:")
+        traceback.print_exc()
     nxt = schedule.next_run()
     if nxt:
         print(f"Next run scheduled for {nxt:%Y-%m-%d %H:%M:%S}.")
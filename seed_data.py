@@ -15,8 +15,11 @@ import random
 from datetime import datetime, timedelta
 
 from database.db_setup import db_connection, getSession
-from database.models import Story, Article, MarketData, PipelineRun, Keyword
-from analysis.sentiment import score_sentiment
+from database.dedup import url_hash
+from database.models import (Story, StoryTicker, Article, MarketData, PipelineRun, KeywordCount,
+                             KeywordHourly, TickerDailySocial, AppState)
+from analysis.sentiment import score_sentiment_batch, SENTIMENT_VERSION
+from analysis.ticker_tags import backfill as backfill_ticker_tags
 from config import TRACKED_TICKERS, TICKER_NAMES, TICKER_KEYWORDS, seed_start_price
 
 random.seed(11)
@@ -67,7 +70,9 @@ def seed():
     db_connection()
     session = getSession()
 
-    for tbl in (Story, Article, MarketData, PipelineRun, Keyword):
+    # app_state too: its checkpoints and crawl state describe the data cleared here
+    for tbl in (StoryTicker, Story, Article, MarketData, PipelineRun, KeywordCount, KeywordHourly,
+                TickerDailySocial, AppState):
         session.query(tbl).delete()
     session.commit()
     print("Cleared existing data")
@@ -85,6 +90,9 @@ def seed():
         # each ticker has its own daily sentiment "mood" random walk
         mood = 0.0
         daily_sentiment = {}
+        # every headline this ticker can get, scored up front in one batch
+        templates = [t.format(name=name, kw=kw) for t in BULLISH + NEUTRAL + BEARISH]
+        title_scores = dict(zip(templates, score_sentiment_batch(templates)))
 
         # ── Generate stories + record each day's aggregate sentiment ──────────
         for d in range(DAYS):
@@ -102,16 +110,19 @@ def seed():
                 else:
                     pool = NEUTRAL if r < 0.5 else (BULLISH if r < 0.75 else BEARISH)
                 title = random.choice(pool).format(name=name, kw=kw)
-                sent = score_sentiment(title)
+                sent = title_scores[title]
                 day_scores.append(sent)
                 platform = random.choice(['hackernews', 'reddit', 'news', 'rss', 'devto'])
+                url = f"https://example.com/{ticker}/{d}/{_}"
                 session.add(Story(
                     title=title,
                     score=random.randint(5, 900),
                     num_comments=random.randint(0, 400),
-                    url=f"https://example.com/{ticker}/{d}/{_}",
+                    url=url,
+                    url_hash=url_hash(url),
                     platform=platform,
                     sentiment=sent,
+                    sentiment_version=SENTIMENT_VERSION,
                     timestamp=day_ts - timedelta(hours=random.randint(0, 20)),
                 ))
                 total_stories += 1
@@ -141,6 +152,7 @@ def seed():
             prev_close = close
 
     session.commit()
+    backfill_ticker_tags(session, rebuild=True)
     print(f"Seeded {total_stories} sentiment-tagged stories")
     print(f"Seeded {total_prices} price bars across {len(TICKERS)} tickers")
 
@@ -0,0 +1,65 @@
+"""
+Import-time budget for the analysis modules.
+
+Importing an analysis module must be cheap and side-effect free: no NLTK,
+VADER or spaCy loading, no downloads, no files written. The scheduler, the
+dashboard and every CLI pay this cost on startup. Each module is imported in a
+fresh interpreter under `-X importtime`, from an empty working directory.
+
+Run with pytest, or directly for a report:  python test/test_import_time.py
+Scale the budgets on slow machines with TRENDFLOW_IMPORT_BUDGET_SCALE=2.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCALE = float(os.getenv('TRENDFLOW_IMPORT_BUDGET_SCALE', '1'))
+
+# module -> cumulative import budget in milliseconds (pandas/SQLAlchemy included)
+BUDGET_MS = {
+    'analysis.sentiment': 150,
+    'analysis.entity_extractor': 150,
+    'analysis.keyword_extractor': 150,
+    'analysis.market_features': 2500,
+}
+# loaded on first use, never at import
+LAZY_MODULES = ('nltk', 'vaderSentiment', 'spacy')
+
+
+def measure(module: str):
+    """(cumulative import ms, lazily-loaded modules that got imported, files created)."""
+    probe = (f"import {module}, sys; "
+             f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))")
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe],
+                              cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+        created = sorted(os.listdir(cwd))
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    cumulative_us = None
+    for line in proc.stderr.splitlines():
+        if line.startswith('import time:') and line.rsplit('|', 1)[-1].strip() == module:
+            cumulative_us = int(line.split('|')[1])
+    loaded = [m for m in proc.stdout.strip().split(',') if m]
+    return cumulative_us / 1000, loaded, created
+
+
+def test_import_budget():
+    for module, budget in BUDGET_MS.items():
+        ms, loaded, created = measure(module)
+        assert not loaded, f"{module} imports {loaded} at import time"
+        assert not created, f"importing {module} created {created}"
+        assert ms <= budget * SCALE, f"{module} took {ms:.0f} ms to import (budget {budget * SCALE:.0f} ms)"
+
+
+if __name__ == "__main__":
+    print("Import-time budget...")
+    for module, budget in BUDGET_MS.items():
+        ms, loaded, created = measure(module)
+        ok = not loaded and not created and ms <= budget * SCALE
+        print(f"  {'ok  ' if ok else 'FAIL'} {module:28s} {ms:7.1f} ms (budget {budget * SCALE:.0f})"
+              + (f"  loads {loaded}" if loaded else "") + (f"  creates {created}" if created else ""))
@@ -0,0 +1,70 @@
+"""
+Query-plan check for the feature queries.
+
+Builds a small database through the migrations (so the indexes are exactly
+those an upgraded trendflow.db gets), runs the analysis reads and asserts that
+none of them full-scans stories, keyword_counts, market_data or articles.
+
+Run with pytest, or directly for a report:  python test/test_query_plans.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import db_setup  # noqa: E402
+from database.bulk import insert_keywords  # noqa: E402
+from database.migrations import LATEST, feature_queries, full_scans  # noqa: E402
+from database.models import MarketData, Story, StoryTicker  # noqa: E402
+
+
+def _seed(session):
+    now = datetime.utcnow()
+    for i in range(20):
+        ts = now - timedelta(hours=6 * i)
+        story = Story(title=f"Apple shares move on report {i}", url=f"https://example.com/{i}",
+                      score=i, sentiment=0.1, timestamp=ts)
+        session.add(story)
+        session.flush()
+        session.add(StoryTicker(story_id=story.id, ticker='AAPL'))
+        day = datetime(now.year, now.month, now.day) - timedelta(days=i)
+        session.add(MarketData(ticker='AAPL', date=day, open=100, high=101, low=99,
+                               close=100 + i, volume=1000, return_pct=0.5))
+        insert_keywords(session, [{'keyword': k, 'platform': 'hackernews', 'count': c,
+                                   'timestamp': ts} for k, c in (('apple', 3), ('report', 1))])
+    session.commit()
+
+
+def scans_on_fresh_db():
+    """(schema version, full scans) for a seeded temporary database."""
+    saved = db_setup.DB_URL
+    with tempfile.TemporaryDirectory() as tmp:
+        db_setup.DB_URL = f"sqlite:///{tmp}/plans.db"
+        try:
+            version = db_setup.db_connection()
+            writer = db_setup.getSession()
+            _seed(writer)
+            writer.close()
+            session = db_setup.getSession(readonly=True)
+            scans = full_scans(session, lambda: feature_queries(session))
+            session.close()
+        finally:
+            db_setup.dispose_engines()
+            db_setup.DB_URL = saved
+    return version, scans
+
+
+def test_feature_queries_use_indexes():
+    version, scans = scans_on_fresh_db()
+    assert version == LATEST
+    assert not scans, "full scans:\n" + "\n".join(f"{d}: {s}" for s, d in scans)
+
+
+if __name__ == "__main__":
+    version, scans = scans_on_fresh_db()
+    print(f"Schema v{version}; {len(scans)} full scan(s)")
+    for statement, detail in scans:
+        print(f"  {detail}\n    in: {' '.join(statement.split())[:200]}")
@@ -1,7 +1,8 @@
-from database.db_setup import getSession
+from database.db_setup import db_connection, getSession
 from analysis.trend_detector import detect_trending_keywords
 
-session = getSession()
+db_connection()  # create or upgrade the schema before reading
+session = getSession(readonly=True)
 trends = detect_trending_keywords(session, velocity_threshold=2.0)
 
 print(f"Found {len(trends)} trending keywords:\n")
@@ -1,95 +1,206 @@
-import requests
-from database.models import Story, Keyword, Article, PipelineRun, MarketData
+import os
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from database.models import PipelineRun, MarketData
+from database.app_state import get_value, set_value
 from database.db_setup import db_connection, getSession
+from database.dedup import UrlIndex, url_hash
+from database.near_dup import NearDupIndex, load_index as load_near_dups
+from database import bulk
 from datetime import datetime
-from analysis.entity_extractor import extract_entities
-from analysis.sentiment import score_sentiment
+from analysis.annotate import annotate_titles
+from analysis.sentiment import SENTIMENT_VERSION
+from analysis.ticker_tags import tag_stories
 from data_collection.news_collector import search_news
+from data_collection.hn_collector import collect_hn
 from data_collection.reddit_collector import collect_reddit
 from data_collection.devto_collector import collect_devto
 from data_collection.github_collector import collect_github_trending
 from data_collection.rss_collector import collect_rss
 from data_collection.market_collector import collect_market_data, collect_ticker_news
 from collections import Counter
+from sqlalchemy import func
 
 
-def _existing_urls(session) -> set:
-    """Fetch all URLs already stored (for deduplication)."""
-    story_urls = {r[0] for r in session.query(Story.url).filter(Story.url != '').all()}
-    article_urls = {r[0] for r in session.query(Article.url).filter(Article.url != '').all()}
-    return story_urls | article_urls
+def _refresh_stories(session, posts) -> int:
+    """Update engagement on already-stored stories a collector re-polled (`_refresh`)."""
+    rows = [{'url_hash': url_hash(p.get('url', '')), 'score': p.get('score', 0),
+             'num_comments': p.get('num_comments', 0)} for p in posts]
+    return bulk.update_engagement(session, [r for r in rows if r['url_hash']])
 
 
-def _save_stories(session, posts, platform_label, existing_urls: set):
-    """Persist new Story rows (skipping duplicate URLs) and return extracted entities."""
+def _save_stories(session, posts, platform_label, url_index: UrlIndex,
+                  near_dups: NearDupIndex = None):
+    """
+    Bulk-insert new Story rows (skipping duplicate URLs) and return extracted
+    entities. Near-duplicate headlines are flagged or dropped (`near_dups`).
+    """
     all_entities = []
-    new_count = 0
-    for post in posts:
-        url = post.get('url', '')
-        if url and url in existing_urls:
+    rows = []
+    now = datetime.utcnow()
+    hashes = [url_hash(post.get('url', '')) for post in posts]
+    fresh = url_index.filter_new(hashes)
+    new_posts = []
+    collapsed = 0
+    for post, h in zip(posts, hashes):
+        if h and h not in fresh:
             continue
-        if url:
-            existing_urls.add(url)
-        story = Story(
-            title=post['title'],
-            score=post.get('score', 0),
-            num_comments=post.get('num_comments', 0),
-            url=url,
-            platform=platform_label,
-            sentiment=score_sentiment(post['title']),
-            timestamp=post.get('_timestamp') or datetime.utcnow(),
-        )
-        session.add(story)
-        new_count += 1
-        all_entities.extend(extract_entities(post['title'], top_n=10))
-    return all_entities, new_count
+        url_index.add(h)
+        fresh.discard(h)  # a repeat later in the same batch is a duplicate
+        dup = near_dups is not None and near_dups.check(
+            post['title'], post.get('_timestamp') or now) is not None
+        if dup and near_dups.collapse:
+            collapsed += 1
+            continue
+        new_posts.append((post, h, dup))
+    if collapsed:
+        print(f"  dropped {collapsed} near-duplicate headlines")
 
+    titles = [post['title'] for post, _, _ in new_posts]
+    annotations = annotate_titles(titles, top_n=10)   # one text pass for all NLP
+    for (post, h, dup), annotation in zip(new_posts, annotations):
+        rows.append({
+            'title': post['title'],
+            'score': post.get('score', 0),
+            'num_comments': post.get('num_comments', 0),
+            'url': post.get('url', ''),
+            'url_hash': h,
+            'platform': platform_label,
+            'sentiment': annotation.sentiment,
+            'sentiment_version': SENTIMENT_VERSION,
+            'near_dup': dup,
+            'timestamp': post.get('_timestamp') or now,
+        })
+    # the insert still skips URLs already stored that the index check let
+    # through (e.g. a stale Bloom filter); only rows actually added count
+    inserted = bulk.insert_stories(session, rows)
+    added = {h for _, _, h in inserted}
+    for (_, h, dup), annotation in zip(new_posts, annotations):
+        if (h is None or h in added) and not dup:   # a syndicated copy shouldn't count twice
+            all_entities.extend(annotation.entities)
+    tag_stories(session, [(story_id, title) for story_id, title, _ in inserted],
+                {title: a.tickers for title, a in zip(titles, annotations)})
+    return all_entities, len(inserted)
+
+
+def _last_bar_dates(session) -> dict:
+    """Date of the newest stored bar per ticker — where incremental fetching resumes."""
+    return dict(session.query(MarketData.ticker, func.max(MarketData.date))
+                .group_by(MarketData.ticker).all())
 
-def _collect_market(session):
-    """Fetch daily prices for tracked tickers and upsert into MarketData."""
-    print("=== Market Prices (yfinance) ===")
-    try:
-        bars = collect_market_data()
-        existing = {(m.ticker, m.date.date() if hasattr(m.date, 'date') else m.date)
-                    for m in session.query(MarketData).all()}
-        added = 0
-        for b in bars:
-            key = (b['ticker'], b['date'].date() if hasattr(b['date'], 'date') else b['date'])
-            if key in existing:
-                continue
-            existing.add(key)
-            session.add(MarketData(
-                ticker=b['ticker'], date=b['date'], open=b['open'], close=b['close'],
-                high=b['high'], low=b['low'], volume=b['volume'], return_pct=b['return_pct']))
-            added += 1
-        session.commit()
-        print(f"Saved {added} new price bars\n")
-        return added > 0
-    except Exception as e:
-        print(f"Market error: {e}\n")
-        return False
+
+def _save_market(session, bars):
+    """Upsert fetched daily price bars into MarketData. Returns rows inserted or updated."""
+    return bulk.upsert_market_bars(session, bars)
 
 
 def _save_keywords(session, entity_list, platform_label):
     counts = Counter(entity_list)
-    for entity, count in counts.items():
-        session.add(Keyword(
-            keyword=entity,
-            platform=platform_label,
-            count=count,
-            timestamp=datetime.utcnow(),
-        ))
+    now = datetime.utcnow()
+    bulk.insert_keywords(session, [
+        {'keyword': entity, 'platform': platform_label, 'count': count, 'timestamp': now}
+        for entity, count in counts.items()
+    ])
     return counts
 
 
-def run_pipeline():
+# ── Sources ───────────────────────────────────────────────────────────────────
+# (label, display name, fetch function, what one item is called). Fetchers only
+# touch the network; every database write happens on the pipeline's own thread.
+STORY_SOURCES = [
+    ('hackernews', 'Hacker News', collect_hn, 'HN stories'),
+    ('reddit', 'Reddit', collect_reddit, 'Reddit posts'),
+    ('devto', 'Dev.to', collect_devto, 'Dev.to articles'),
+    ('github', 'GitHub Trending', collect_github_trending, 'GitHub repos'),
+    ('rss', 'RSS Feeds', collect_rss, 'RSS articles'),
+    ('finance', 'Ticker News (yfinance)', collect_ticker_news, 'ticker headlines'),
+]
+MARKET_SOURCE = ('market', 'Market Prices (yfinance)', collect_market_data, 'price bars')
+# Incremental collectors' crawl state (what this database already holds), by
+# source label → app_state key. The fetch gets it as `state=` and hands back
+# the updated state, stored in the same transaction as the source's rows.
+CRAWL_STATE_KEYS = {
+    'hackernews': 'hn_collector.crawl',
+    'rss': 'rss_collector.crawl',
+}
+
+# Fetch every source at once (run time ~ slowest source) or one after another.
+PARALLEL = os.getenv('TRENDFLOW_PARALLEL', '1') != '0'
+
+
+def _fetch_sources(sources, parallel: bool):
+    """
+    Yield (source, result) as each source's fetch finishes. A fetch that raises
+    yields its exception instead, so one failing source never aborts the run.
+    """
+    if not parallel:
+        for source in sources:
+            try:
+                yield source, source[2]()
+            except Exception as e:
+                yield source, e
+        return
+
+    with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+        futures = {pool.submit(source[2]): source for source in sources}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+
+
+def _save_news(session, top_keywords, url_index: UrlIndex) -> int:
+    """Cross-reference the run's top entities on NewsAPI and store new articles."""
+    news_articles = search_news(top_keywords, max_results=20)
+    rows = []
+    now = datetime.utcnow()
+    hashes = [url_hash(article.get('url', '')) for article in news_articles]
+    fresh = url_index.filter_new(hashes)
+    for article, h in zip(news_articles, hashes):
+        if h and h not in fresh:
+            continue
+        url_index.add(h)
+        fresh.discard(h)
+        try:
+            pub_date = datetime.fromisoformat(article['published_at'].replace('Z', '+00:00'))
+        except Exception:
+            pub_date = now
+        rows.append({
+            'title': article['title'],
+            'url': article.get('url', ''),
+            'url_hash': h,
+            'source': article['source'],
+            'published_at': pub_date,
+            'platform': 'news',
+            'timestamp': now,
+        })
+    bulk.insert_articles(session, rows)
+    session.commit()
+    return len(rows)
+
+
+def run_pipeline(parallel: bool = None):
+    """
+    Run one collection pass. All sources are fetched concurrently by default
+    (TRENDFLOW_PARALLEL=0 for the old one-at-a-time order); results are handed
+    to this thread, the single writer that owns the SQLAlchemy session.
+    """
+    parallel = PARALLEL if parallel is None else parallel
+
     print("Initializing database…")
     db_connection()
     session = getSession()
     print("Database ready!\n")
 
-    existing_urls = _existing_urls(session)
-    print(f"Already stored {len(existing_urls)} unique URLs (will skip duplicates)\n")
+    url_index = UrlIndex(session)
+    bloom = "with Bloom filter" if url_index.bloom is not None else "index only"
+    print(f"URL dedup ready ({bloom}; duplicates are skipped)")
+    near_dups = load_near_dups(session)
+    if near_dups is not None:
+        action = "dropped" if near_dups.collapse else "flagged"
+        print(f"Near-duplicate headlines are {action} ({len(near_dups)} recent titles indexed)")
+    print()
 
     # ── Start pipeline run tracking ───────────────────────────────────────────
     run = PipelineRun(
@@ -103,146 +214,71 @@ def run_pipeline():
     total_stories = 0
     sources_run = []
 
-    # ── Hacker News ───────────────────────────────────────────────────────────
-    print("=== Hacker News ===")
-    url = "https://hacker-news.firebaseio.com/v0/topstories.json"
-    try:
-        response = requests.get(url, timeout=10)
-        story_ids = response.json()
-        hn_posts = []
-        for story_id in story_ids[:100]:
-            item_url = f'https://hacker-news.firebaseio.com/v0/item/{story_id}.json'
-            item = requests.get(item_url, timeout=10).json()
-            if not item or not item.get('title'):
+    # ── Headlines + prices, fetched concurrently, written here ────────────────
+    # prices are incremental: each ticker resumes from its newest stored bar
+    label, name, fetch, noun = MARKET_SOURCE
+    market = (label, name, partial(fetch, since=_last_bar_dates(session)), noun)
+    # incremental collectors resume from the crawl state stored with the rows
+    sources = []
+    for label, name, fetch, noun in STORY_SOURCES:
+        if label in CRAWL_STATE_KEYS:
+            fetch = partial(fetch, state=get_value(session, CRAWL_STATE_KEYS[label], {}))
+        sources.append((label, name, fetch, noun))
+    mode = "parallel" if parallel else "sequential"
+    print(f"Fetching {len(sources) + 1} sources ({mode})…\n")
+    for source, result in _fetch_sources(sources + [market], parallel):
+        label, name, _, noun = source
+        print(f"=== {name} ===")
+        if isinstance(result, Exception):
+            print(f"{name} error: {result}\n")
+            continue
+        # incremental collectors hand back their new crawl state, committed with
+        # the rows, so a failed write is fetched again next run
+        crawl_state = None
+        if isinstance(result, tuple):
+            result, crawl_state = result
+        try:
+            if label == 'market':
+                added = _save_market(session, result)
+                session.commit()
+                if added:
+                    sources_run.append(label)
+                print(f"Saved {added} new or updated {noun}\n")
                 continue
-            hn_posts.append({
-                'title': item['title'],
-                'score': item.get('score', 0),
-                'num_comments': item.get('descendants', 0),
-                'url': item.get('url', ''),
-            })
-            print(f"  {item['title'][:70]}…")
-        entities, new_count = _save_stories(session, hn_posts, 'hackernews', existing_urls)
-        all_entities.extend(entities)
-        counts = _save_keywords(session, entities, 'hackernews')
-        session.commit()
-        total_stories += new_count
-        sources_run.append('hackernews')
-        print(f"Saved {new_count} new HN stories, {len(counts)} entity types\n")
-    except Exception as e:
-        print(f"HN error: {e}\n")
-
-    # ── Reddit ────────────────────────────────────────────────────────────────
-    print("=== Reddit ===")
-    try:
-        reddit_posts = collect_reddit()
-        entities, new_count = _save_stories(session, reddit_posts, 'reddit', existing_urls)
-        all_entities.extend(entities)
-        counts = _save_keywords(session, entities, 'reddit')
-        session.commit()
-        total_stories += new_count
-        sources_run.append('reddit')
-        print(f"Saved {new_count} new Reddit posts, {len(counts)} entity types\n")
-    except Exception as e:
-        print(f"Reddit error: {e}\n")
-
-    # ── Dev.to ────────────────────────────────────────────────────────────────
-    print("=== Dev.to ===")
-    try:
-        devto_posts = collect_devto()
-        entities, new_count = _save_stories(session, devto_posts, 'devto', existing_urls)
-        all_entities.extend(entities)
-        counts = _save_keywords(session, entities, 'devto')
-        session.commit()
-        total_stories += new_count
-        sources_run.append('devto')
-        print(f"Saved {new_count} new Dev.to articles, {len(counts)} entity types\n")
-    except Exception as e:
-        print(f"Dev.to error: {e}\n")
-
-    # ── GitHub Trending ───────────────────────────────────────────────────────
-    print("=== GitHub Trending ===")
-    try:
-        github_posts = collect_github_trending()
-        entities, new_count = _save_stories(session, github_posts, 'github', existing_urls)
-        all_entities.extend(entities)
-        counts = _save_keywords(session, entities, 'github')
-        session.commit()
-        total_stories += new_count
-        sources_run.append('github')
-        print(f"Saved {new_count} new GitHub repos, {len(counts)} entity types\n")
-    except Exception as e:
-        print(f"GitHub error: {e}\n")
-
-    # ── RSS Feeds ────────────────────────────────────────────────────────────
-    print("=== RSS Feeds ===")
-    try:
-        rss_posts = collect_rss()
-        entities, new_count = _save_stories(session, rss_posts, 'rss', existing_urls)
-        all_entities.extend(entities)
-        counts = _save_keywords(session, entities, 'rss')
-        session.commit()
-        total_stories += new_count
-        sources_run.append('rss')
-        print(f"Saved {new_count} new RSS articles, {len(counts)} entity types\n")
-    except Exception as e:
-        print(f"RSS error: {e}\n")
+            refresh = [p for p in result if p.get('_refresh')]
+            posts = [p for p in result if not p.get('_refresh')]
+            refreshed = _refresh_stories(session, refresh)
+            entities, new_count = _save_stories(session, posts, label, url_index, near_dups)
+            all_entities.extend(entities)
+            counts = _save_keywords(session, entities, label)
+            if crawl_state is not None:
+                set_value(session, CRAWL_STATE_KEYS[label], crawl_state)
+            session.commit()
+            total_stories += new_count
+            # ticker news is only worth reporting when it actually added rows
+            if label != 'finance' or new_count:
+                sources_run.append(label)
+            print(f"Saved {new_count} new {noun}, {len(counts)} entity types"
+                  + (f", refreshed {refreshed}" if refresh else "") + "\n")
+        except Exception as e:
+            session.rollback()
+            print(f"{name} error: {e}\n")
 
     # ── NewsAPI (cross-reference top entities) ────────────────────────────────
+    # Runs last: its query is built from the entities the other sources produced.
     print("=== NewsAPI ===")
     top_entities = [kw for kw, _ in Counter(all_entities).most_common(10)]
     # Filter to single-word terms for NewsAPI compatibility
     top_keywords = [e for e in top_entities if ' ' not in e][:10]
     print(f"Cross-referencing top entities: {top_keywords}")
     try:
-        news_articles = search_news(top_keywords, max_results=20)
-        new_articles = 0
-        for article in news_articles:
-            url = article.get('url', '')
-            if url and url in existing_urls:
-                continue
-            if url:
-                existing_urls.add(url)
-            try:
-                pub_date = datetime.fromisoformat(article['published_at'].replace('Z', '+00:00'))
-            except Exception:
-                pub_date = datetime.utcnow()
-            session.add(Article(
-                title=article['title'],
-                url=url,
-                source=article['source'],
-                published_at=pub_date,
-                platform='news',
-                timestamp=datetime.utcnow(),
-            ))
-            new_articles += 1
-        session.commit()
+        new_articles = _save_news(session, top_keywords, url_index)
         sources_run.append('news')
         print(f"Saved {new_articles} new news articles\n")
     except Exception as e:
+        session.rollback()
         print(f"NewsAPI error (check NEWS_API_KEY in .env): {e}\n")
 
-    # ── Per-ticker financial news (yfinance) — real, already ticker-tagged ─────
-    print("=== Ticker News (yfinance) ===")
-    try:
-        news_posts = collect_ticker_news()
-        # keep only genuinely new URLs, score sentiment, tag platform 'finance'
-        fresh = [p for p in news_posts if not p.get('url') or p['url'] not in existing_urls]
-        entities, new_count = _save_stories(session, fresh, 'finance', existing_urls)
-        all_entities.extend(entities)
-        _save_keywords(session, entities, 'finance')
-        session.commit()
-        total_stories += new_count
-        if new_count:
-            sources_run.append('finance')
-        print(f"Saved {new_count} new ticker headlines\n")
-    except Exception as e:
-        print(f"Ticker news error: {e}\n")
-
-    # ── Market prices ─────────────────────────────────────────────────────────
-    if _collect_market(session):
-        sources_run.append('market')
-
     # ── Finalize pipeline run ─────────────────────────────────────────────────
     run.finished_at = datetime.utcnow()
     run.status = 'success'
@@ -250,6 +286,7 @@ def run_pipeline():
     run.keywords_extracted = len(set(all_entities))
     run.sources_run = ','.join(sources_run)
     session.commit()
+    url_index.close()
 
     elapsed = (run.finished_at - run.started_at).total_seconds()
     print("=" * 60)
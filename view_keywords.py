@@ -1,7 +1,8 @@
-from database.db_setup import getSession
+from database.db_setup import db_connection, getSession
 from database.models import Keyword
 
-session = getSession()
+db_connection()  # create or upgrade the schema before reading
+session = getSession(readonly=True)
 
 keywords = session.query(Keyword).order_by(Keyword.count.desc()).all()
 